@@ -0,0 +1,276 @@
+"""
+Benchmark: Scripted, repeatable versions of the Sprite2 experiments.
+    Instead of pressing F2 and watching the PerfGraph, each scenario is
+    run headless for a fixed number of frames from a fixed seed.
+    The update, spawn and sort phases of every frame are timed and
+    summarised (mean and percentiles) in a JSON and a CSV report.
+Scenarios:
+    - Every meteor type in sprite2_meteor_performance (per sprite update,
+      vectorized MeteorField, vectorized with amortized spawning, and
+      that again with the meteors moved in a worker process). Frames
+      are not throttled, and the worker is only asked for a step once
+      it has finished the last one, so when it is slower than the
+      frames the meteors (and new ones) move less often than once a
+      frame: compare its p95 with care.
+    - Single and separate spritelists (copied or merged when drawn) in
+      sprite2_spritelist_performance.
+    - Optionally, QuantizedRotatingMeteor with different numbers of
+      rotation buckets: the update time against the angle error.
+    - Optionally, the update time with 0 (none) to N update threads (see
+      parallel_update.py), checking the sprites end up the same.
+Usage:
+    python benchmark.py
+    python benchmark.py --frames 1200 --json results.json --csv results.csv
+    python benchmark.py --rotation-buckets 8 16 32 64 128
+    python benchmark.py --workers 4
+"""
+
+import argparse
+import csv
+import json
+from math import hypot, radians
+from time import perf_counter
+import numpy as np
+import arcade
+
+import sprite2_meteor_performance
+import sprite2_spritelist_performance
+from rotation_cache import RotationCache
+
+FRAMES = 600
+WARMUP_FRAMES = 60  # Not included in the results.
+DT = 1/60
+RANDOM_SEED = 1
+EJECT_FREQUENCY_FRAMES = 30  # Eject all the pilots every this many frames.
+
+PHASES = ["update", "spawn", "sort"]
+PERCENTILES = [50, 95, 99]
+
+
+def scenarios():
+    """ Return a dict of scenario name to a function that builds its
+        Simulation from a seed. """
+    result = {}
+    meteor_types = sprite2_meteor_performance.Simulation.meteor_types
+    for meteor_type, meteor_class in enumerate(meteor_types):
+        for vectorized, amortized, multiprocess in (
+                (False, False, False), (True, False, False),
+                (True, True, False), (True, True, True)):
+            name = meteor_class.__name__
+            if vectorized:
+                name += "_vectorized"
+            if amortized:
+                name += "_amortized"
+            if multiprocess:
+                name += "_multiprocess"
+            result[name] = (
+                lambda random_seed, m=meteor_type, v=vectorized, a=amortized,
+                p=multiprocess:
+                sprite2_meteor_performance.Simulation(
+                    meteor_type=m, vectorized=v, amortized=a,
+                    multiprocess=p, random_seed=random_seed))
+
+    for single, merged, ecs in ((True, False, False), (False, False, False),
+                                (False, True, False), (True, False, True)):
+        name = "single_spritelist" if single else "separate_spritelists"
+        if merged:
+            name += "_merged"
+        if ecs:
+            name += "_ecs"
+        result[name] = (
+            lambda random_seed, s=single, m=merged, e=ecs:
+            sprite2_spritelist_performance.Simulation(
+                single_spritelist=s, merged_draw=m, ecs=e,
+                random_seed=random_seed))
+    return result
+
+
+def run_scenario(make_simulation, frames=FRAMES, warmup=WARMUP_FRAMES,
+                 dt=DT, random_seed=RANDOM_SEED, state=None):
+    """ Run one scenario and return the time (in seconds) each phase
+        took on every frame after the warm up. If a state dict is given,
+        the sprites' final state is put in it as state["sprites"]. """
+    simulation = make_simulation(random_seed)
+    times = {phase: [] for phase in PHASES}
+
+    for frame in range(warmup + frames):
+        start = perf_counter()
+        simulation.update()
+        updated = perf_counter()
+
+        simulation.time += dt
+        simulation.spawn()
+        if frame % EJECT_FREQUENCY_FRAMES == 0:
+            simulation.eject_all_pilots()
+        spawned = perf_counter()
+
+        simulation.depth_sort()
+        sorted_ = perf_counter()
+
+        if frame >= warmup:
+            times["update"].append(updated - start)
+            times["spawn"].append(spawned - updated)
+            times["sort"].append(sorted_ - spawned)
+
+    if state is not None:
+        state["sprites"] = sprite_state(simulation)
+    # Stop any worker process.
+    if hasattr(simulation, "close"):
+        simulation.close()
+    return times
+
+
+def sprite_state(simulation):
+    """ Position, angle and scale of every sprite, in list order. """
+    return [(sprite.center_x, sprite.center_y, sprite.angle, sprite.scale)
+            for sprite_list in (simulation.meteor_list,
+                                simulation.ship_list,
+                                simulation.pilot_list)
+            for sprite in sprite_list]
+
+
+def summarise(times):
+    """ Mean, percentiles and max for each phase (and the whole frame),
+        in milliseconds. """
+    phases = dict(times)
+    phases["frame"] = list(np.sum([times[p] for p in PHASES], axis=0))
+
+    summary = {}
+    for phase, values in phases.items():
+        ms = np.array(values) * 1000
+        stats = {"mean_ms": ms.mean()}
+        for p in PERCENTILES:
+            stats[f"p{p}_ms"] = np.percentile(ms, p)
+        stats["max_ms"] = ms.max()
+        summary[phase] = {k: round(float(v), 4) for k, v in stats.items()}
+    return summary
+
+
+def rotation_report(buckets_list, frames=FRAMES, warmup=WARMUP_FRAMES,
+                    random_seed=RANDOM_SEED):
+    """ For each number of rotation buckets, the QuantizedRotatingMeteor
+        update time and how far out its angle (and edge) can be. """
+    module = sprite2_meteor_performance
+    meteor_class = module.QuantizedRotatingMeteor
+    meteor_type = module.Simulation.meteor_types.index(meteor_class)
+    # The edge of the biggest meteor moves furthest for a given angle.
+    radius = max(hypot(t.width, t.height) / 2 for t in
+                 map(arcade.load_texture, meteor_class.image_list)) * 0.5
+
+    report = {}
+    for buckets in buckets_list:
+        meteor_class.rotation_cache = RotationCache(buckets)
+        times = run_scenario(
+            lambda seed: module.Simulation(meteor_type=meteor_type,
+                                           vectorized=False,
+                                           random_seed=seed),
+            frames, warmup, DT, random_seed)
+        max_error = 180 / buckets  # Half a bucket, in degrees.
+        report[buckets] = {
+            "max_angle_error_degrees": round(max_error, 4),
+            "max_edge_error_pixels": round(radius * radians(max_error), 4),
+            "update": summarise(times)["update"],
+        }
+        print(f"{buckets:4} buckets: angle error <= {max_error:6.2f} deg "
+              f"({radius * radians(max_error):5.2f}px) | update mean "
+              f"{report[buckets]['update']['mean_ms']:7.3f}ms")
+    meteor_class.rotation_cache = RotationCache(module.ROTATION_BUCKETS)
+    return report
+
+
+def scaling_report(max_workers, frames=FRAMES, warmup=WARMUP_FRAMES,
+                   random_seed=RANDOM_SEED):
+    """ The update time of RotatingMeteor (per sprite and vectorized)
+        with 0 to max_workers update threads, the speed up over 0, and
+        whether the sprites ended up exactly as they did with 0.
+        Spawning is not amortized, as its time budget would make the
+        number spawned depend on how fast each run is. """
+    module = sprite2_meteor_performance
+    report = {}
+    for vectorized in (False, True):
+        name = "RotatingMeteor" + ("_vectorized" if vectorized else "")
+        report[name] = {}
+        sequential = None
+        for workers in range(max_workers + 1):
+            state = {}
+            times = run_scenario(
+                lambda seed, w=workers: module.Simulation(
+                    vectorized=vectorized, amortized=False, parallel=w,
+                    random_seed=seed),
+                frames, warmup, DT, random_seed, state)
+            update = summarise(times)["update"]
+            if sequential is None:
+                sequential = update["mean_ms"], state["sprites"]
+            report[name][workers] = {
+                "update": update,
+                "speedup": round(sequential[0] / update["mean_ms"], 3),
+                "identical": state["sprites"] == sequential[1],
+            }
+            print(f"{name:28} {workers:2} workers: update mean "
+                  f"{update['mean_ms']:7.3f}ms "
+                  f"x{report[name][workers]['speedup']:.2f} "
+                  f"identical {report[name][workers]['identical']}")
+    return report
+
+
+def write_csv(report, filename):
+    with open(filename, "w", newline="") as f:
+        writer = None
+        for scenario, phases in report["scenarios"].items():
+            for phase, stats in phases.items():
+                row = {"scenario": scenario, "phase": phase, **stats}
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=FRAMES)
+    parser.add_argument("--warmup", type=int, default=WARMUP_FRAMES)
+    parser.add_argument("--seed", type=int, default=RANDOM_SEED)
+    parser.add_argument("--scenario", action="append",
+                        help="Only run this scenario (can be repeated)")
+    parser.add_argument("--rotation-buckets", type=int, nargs="+",
+                        help="Also compare these numbers of rotation "
+                             "buckets for QuantizedRotatingMeteor")
+    parser.add_argument("--workers", type=int,
+                        help="Also compare 0 to this many update threads")
+    parser.add_argument("--json", default="benchmark.json")
+    parser.add_argument("--csv", default="benchmark.csv")
+    args = parser.parse_args()
+
+    report = {
+        "frames": args.frames,
+        "warmup": args.warmup,
+        "dt": DT,
+        "seed": args.seed,
+        "scenarios": {},
+    }
+    for name, make_simulation in scenarios().items():
+        if args.scenario and name not in args.scenario:
+            continue
+        times = run_scenario(make_simulation, args.frames, args.warmup,
+                             DT, args.seed)
+        summary = summarise(times)
+        report["scenarios"][name] = summary
+        frame = summary["frame"]
+        print(f"{name:48} mean {frame['mean_ms']:7.3f}ms "
+              f"p95 {frame['p95_ms']:7.3f}ms p99 {frame['p99_ms']:7.3f}ms")
+
+    if args.rotation_buckets:
+        report["rotation_buckets"] = rotation_report(
+            args.rotation_buckets, args.frames, args.warmup, args.seed)
+
+    if args.workers:
+        report["workers"] = scaling_report(
+            args.workers, args.frames, args.warmup, args.seed)
+
+    with open(args.json, "w") as f:
+        json.dump(report, f, indent=2)
+    write_csv(report, args.csv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Capacity: How many sprites can this machine hold at the target frame rate?
+    Instead of guessing with MAX_METEORS and METEORS_TO_ADD, each scenario
+    is run headless with a given cap on its sprites, and the cap is
+    doubled until the p95 frame time goes over the target, then bisected
+    between the last cap that held and the first that didn't.
+Scenarios:
+    - Every meteor type in sprite2_meteor_performance, with its default
+      settings. The cap is max_meteors (with meteors_to_add in the same
+      proportion as MAX_METEORS and METEORS_TO_ADD). Spawning is spread
+      evenly over the frames with no time budget, so the meteors reach
+      the cap however slow each frame is.
+    - Each spritelist layout in sprite2_spritelist_performance (single,
+      separate, and separate with a merged draw). The cap is max_ships,
+      and every ship ejects a pilot every EJECT_FREQUENCY_FRAMES (see
+      benchmark.py), so there are several times as many sprites.
+    The frame time is the update, spawn and sort phases, like
+    benchmark.py. Drawing is not included, so leave room for it with a
+    lower --target-ms on a real machine.
+Usage:
+    python capacity.py
+    python capacity.py --fps 60 --scenario RotatingMeteor
+    python capacity.py --target-ms 10 --json capacity.json
+"""
+
+import argparse
+import json
+from math import ceil
+
+import sprite2_meteor_performance
+import sprite2_spritelist_performance
+from benchmark import run_scenario, summarise
+
+TARGET_FPS = 60
+FRAMES = 300
+WARMUP_FRAMES = 180  # Long enough to fill up to the cap.
+RANDOM_SEED = 1
+START_COUNT = 500
+MAX_COUNT = 200000
+RESOLUTION = 0.02  # Stop bisecting when the gap is within 2% of the count.
+PERCENTILE = "p95_ms"
+
+
+def scenarios():
+    """ Return a dict of scenario name to a function that builds its
+        Simulation from a seed and a cap on its sprites. """
+    result = {}
+    meteors = sprite2_meteor_performance
+    burst = meteors.METEORS_TO_ADD / meteors.MAX_METEORS
+    for meteor_type, meteor_class in enumerate(
+            meteors.Simulation.meteor_types):
+        result[meteor_class.__name__] = (
+            lambda random_seed, count, m=meteor_type, b=burst:
+            even_spawning(meteors.Simulation(
+                meteor_type=m, max_meteors=count,
+                meteors_to_add=max(1, round(count * b)),
+                random_seed=random_seed)))
+
+    layouts = sprite2_spritelist_performance
+    burst = layouts.SHIPS_TO_ADD / layouts.MAX_SHIPS
+    for single, merged, ecs in ((True, False, False), (False, False, False),
+                                (False, True, False), (True, False, True)):
+        name = "single_spritelist" if single else "separate_spritelists"
+        if merged:
+            name += "_merged"
+        if ecs:
+            name += "_ecs"
+        result[name] = (
+            lambda random_seed, count, s=single, m=merged, e=ecs, b=burst:
+            layouts.Simulation(single_spritelist=s, merged_draw=m, ecs=e,
+                               max_ships=count,
+                               ships_to_add=max(1, ceil(count * b)),
+                               random_seed=random_seed))
+    return result
+
+
+def even_spawning(simulation):
+    """ Spawn everything owed every frame (if spawning is amortized). """
+    if simulation.spawner:
+        simulation.spawner.budget = None
+    return simulation
+
+
+def probe(make_simulation, count, frames=FRAMES, warmup=WARMUP_FRAMES,
+          random_seed=RANDOM_SEED):
+    """ Run a scenario capped at count. Returns the frame time stats and
+        the number of sprites alive at the end. """
+    state = {}
+    times = run_scenario(lambda seed: make_simulation(seed, count), frames,
+                         warmup, random_seed=random_seed, state=state)
+    return summarise(times)["frame"], len(state["sprites"])
+
+
+def search(make_simulation, target_ms, start=START_COUNT,
+           max_count=MAX_COUNT, resolution=RESOLUTION, **run_options):
+    """ The highest cap whose p95 frame time is within target_ms, and
+        every cap tried on the way as {count: (stats, sprites)}. """
+    probes = {}
+
+    def holds(count):
+        stats, sprites = probes[count] = probe(make_simulation, count,
+                                               **run_options)
+        print(f"    cap {count:7} sprites {sprites:7} "
+              f"p95 {stats[PERCENTILE]:7.3f}ms")
+        return stats[PERCENTILE] <= target_ms
+
+    # Double until it doesn't hold...
+    low, high = 0, start
+    while holds(high):
+        low = high
+        if high >= max_count:
+            return low, probes
+        high = min(high * 2, max_count)
+
+    # ...then bisect between the last that held and the first that didn't.
+    while high - low > max(1, low * resolution):
+        middle = (low + high) // 2
+        if holds(middle):
+            low = middle
+        else:
+            high = middle
+    return low, probes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fps", type=float, default=TARGET_FPS)
+    parser.add_argument("--target-ms", type=float,
+                        help="p95 frame time to hold (default 1000/fps)")
+    parser.add_argument("--frames", type=int, default=FRAMES)
+    parser.add_argument("--warmup", type=int, default=WARMUP_FRAMES)
+    parser.add_argument("--seed", type=int, default=RANDOM_SEED)
+    parser.add_argument("--start", type=int, default=START_COUNT)
+    parser.add_argument("--scenario", action="append",
+                        help="Only search this scenario (can be repeated)")
+    parser.add_argument("--json", default="capacity.json")
+    args = parser.parse_args()
+    target_ms = args.target_ms or 1000 / args.fps
+
+    report = {"target_ms": round(target_ms, 4), "frames": args.frames,
+              "warmup": args.warmup, "seed": args.seed, "scenarios": {}}
+    for name, make_simulation in scenarios().items():
+        if args.scenario and name not in args.scenario:
+            continue
+        print(f"{name}:")
+        count, probes = search(make_simulation, target_ms, args.start,
+                               frames=args.frames, warmup=args.warmup,
+                               random_seed=args.seed)
+        stats, sprites = probes.get(count, ({}, 0))
+        report["scenarios"][name] = {
+            "max_count": count,
+            "sprites": sprites,
+            "p95_ms": stats.get(PERCENTILE),
+            "probes": {c: {"sprites": s, **st}
+                       for c, (st, s) in sorted(probes.items())},
+        }
+        print(f"{name:28} holds cap {count} ({sprites} sprites) "
+              f"within {target_ms:.2f}ms p95")
+
+    with open(args.json, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+DepthSort: A spritelist that stays sorted by scale (depth).
+    Sorting the whole list every frame is wasted work when only a few
+    sprites (tumbling ships, pilots) change scale. Instead:
+        - New sprites are inserted in the right place.
+        - Sprites tell their spritelists when their size changes, so only
+          those get moved, and only if they are now out of order.
+        - If nothing changed scale, there's nothing to do at all.
+    MergedDepthView draws several of these lists in one merged depth order
+    without copying their sprites into a new spritelist every frame.
+"""
+
+from bisect import bisect_right
+from operator import attrgetter
+import numpy as np
+import arcade
+
+get_scale = attrgetter("scale")
+
+# If more than this fraction of the list has moved, one full sort is
+# cheaper than moving them one at a time.
+FULL_SORT_FRACTION = 1/16
+
+
+###############################################################################
+class DepthSortedSpriteList(arcade.SpriteList):
+    """ A SpriteList kept in scale order, so bigger/nearer sprites are
+        drawn over far away ones. Call sort_by_depth() before drawing. """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.moved = set()  # Sprites whose scale changed since last sort.
+        self.last_sort_size = 0  # Sprites moved by the last sort.
+
+    def append(self, sprite):
+        """ Insert the sprite in depth order. """
+        self.insert(bisect_right(self.sprite_list, sprite.scale,
+                                 key=get_scale), sprite)
+        # arcade 2.6 insert() reorders the index data but doesn't mark
+        # it for upload, so without this the new order is never drawn.
+        self._sprite_index_changed = True
+
+    def remove(self, sprite):
+        super().remove(sprite)
+        self.moved.discard(sprite)
+
+    def update_size(self, sprite):
+        """ Called by the sprite when its scale changes. """
+        super().update_size(sprite)
+        self.moved.add(sprite)
+
+    def sort_by_depth(self):
+        """ Put any sprites that changed scale back in depth order. """
+        moved = self.moved
+        self.last_sort_size = 0
+        if not moved:
+            return
+
+        if len(moved) > len(self.sprite_list) * FULL_SORT_FRACTION:
+            self.sort(key=get_scale)
+            self.last_sort_size = len(self.sprite_list)
+        else:
+            # Everything that didn't move is still in order, so take the
+            # moved sprites out and put each one back in its place.
+            for sprite in moved:
+                super().remove(sprite)
+            for sprite in moved:
+                self.append(sprite)
+            self.last_sort_size = len(moved)
+        moved.clear()
+
+
+###############################################################################
+class MergedDepthView:
+    """ Draw several depth sorted spritelists as if they were one list.
+        Each list keeps its own buffers on the GPU, so nothing is copied.
+        Instead the merged order is drawn as runs: a range of sprites from
+        one list, then a range from the next, and so on. """
+
+    def __init__(self, *sprite_lists):
+        self.sprite_lists = sprite_lists
+        self.runs = []  # (sprite_list, first, count) in drawing order.
+
+    def __len__(self):
+        return sum(len(sprite_list) for sprite_list in self.sprite_lists)
+
+    def merge(self):
+        """ Work out the runs to draw. Every list must already be in scale
+            order. Sprites with the same scale are drawn in list order. """
+        lists = self.sprite_lists
+        scales = [np.fromiter((s.scale for s in sprite_list), float,
+                              len(sprite_list)) for sprite_list in lists]
+        list_ids = np.repeat(np.arange(len(lists)), [len(s) for s in scales])
+        order = np.argsort(np.concatenate(scales), kind="stable")
+        list_ids = list_ids[order]
+
+        # A new run starts wherever the merged order switches list.
+        starts = np.flatnonzero(np.diff(list_ids)) + 1
+        starts = np.concatenate(([0], starts)) if len(list_ids) else starts
+        counts = np.diff(np.append(starts, len(list_ids)))
+
+        self.runs = []
+        firsts = [0] * len(lists)
+        for list_id, count in zip(list_ids[starts].tolist(), counts.tolist()):
+            self.runs.append((lists[list_id], firsts[list_id], count))
+            firsts[list_id] += count
+        return self
+
+    def draw(self):
+        """ Draw the runs found by the last merge(). """
+        for sprite_list in self.sprite_lists:
+            if sprite_list:
+                prepare_to_draw(sprite_list)
+        for sprite_list, first, count in self.runs:
+            draw_range(sprite_list, first, count)
+
+
+def prepare_to_draw(sprite_list):
+    """ Send any changed sprite data to the GPU, and set up blending the
+        same way SpriteList.draw() does. """
+    sprite_list.initialize()
+    sprite_list.write_sprite_buffers_to_gpu()
+    ctx = sprite_list.ctx
+    ctx.enable(ctx.BLEND)
+    ctx.blend_func = ctx.BLEND_DEFAULT
+    sprite_list.atlas.texture.filter = ctx.LINEAR, ctx.LINEAR
+
+
+def draw_range(sprite_list, first, count):
+    """ Draw count sprites from a prepared spritelist, starting at first.
+        This is the last part of SpriteList.draw(), limited to a range of
+        the (sorted) index buffer. """
+    try:
+        sprite_list.program["spritelist_color"] = sprite_list.color_normalized
+    except KeyError:
+        pass
+    sprite_list.atlas.texture.use(0)
+    sprite_list.atlas.use_uv_texture(1)
+    sprite_list.geometry.render(sprite_list.program,
+                                mode=sprite_list.ctx.POINTS,
+                                first=first, vertices=count)
@@ -0,0 +1,185 @@
+"""
+ECS: Ships, pilots and meteors as entities made of components.
+    Instead of a sprite subclass per kind of thing, each with its own
+    update() (and type() checks wherever they are mixed in one list),
+    an entity is a row in an Archetype: a set of components, each kept
+    in contiguous NumPy arrays, one per field:
+        - position: x, y
+        - velocity: delta_x, delta_y (per frame)
+        - rotation: angle, delta_angle (angular velocity)
+        - scale_animation: scale, delta_scale, max_scale. Grows (or
+          shrinks) by delta_scale, turning back at max_scale, and dies
+          at zero.
+        - bounds: half_width (at scale 1, if it has scale_animation).
+          Culled once off the edge of the screen it is heading for.
+        - tumbling: a flag.
+    A World runs each system (movement, rotation, scaling, culling) over
+    every archetype that has its components, a whole archetype at a
+    time, then a sync step writes the results into the arcade sprites
+    that draw them. Sprites of any archetype can share one SpriteList,
+    and still only ever run their own archetype's logic.
+"""
+
+import numpy as np
+
+COMPONENTS = {
+    "position": ("x", "y"),
+    "velocity": ("delta_x", "delta_y"),
+    "rotation": ("angle", "delta_angle"),
+    "scale_animation": ("scale", "delta_scale", "max_scale"),
+    "bounds": ("half_width",),
+    "tumbling": ("tumbling",),
+}
+FLAGS = {"tumbling"}  # Boolean fields.
+
+
+###############################################################################
+class Archetype:
+    """ Entities that all have the same components. Each entity is drawn
+        by a sprite, and its fields are arrays indexed by row. """
+
+    def __init__(self, name, *components):
+        self.name = name
+        self.components = set(components)
+        self.fields = [field for component in components
+                       for field in COMPONENTS[component]]
+        self.sprites = []
+        self.arrays = {field: np.zeros(0, bool if field in FLAGS else float)
+                       for field in self.fields}
+        self.new = []  # (sprite, values), added since the last flush.
+        self.rows = None  # sprite -> row, worked out when needed.
+
+    def __len__(self):
+        return len(self.sprites) + len(self.new)
+
+    def __contains__(self, sprite):
+        return self.row(sprite) is not None
+
+    def __getitem__(self, field):
+        self.flush()
+        return self.arrays[field]
+
+    def has(self, *components):
+        return self.components.issuperset(components)
+
+    def add(self, sprite, **values):
+        """ Add an entity drawn by sprite. Fields not given are 0 (or
+            False). Its rows are built in bulk when next needed. """
+        self.new.append((sprite, values))
+
+    def flush(self):
+        """ Move newly added entities into the arrays. """
+        if not self.new:
+            return
+        new = self.new
+        self.new = []
+        self.sprites.extend(sprite for sprite, _ in new)
+        for field, array in self.arrays.items():
+            column = [values.get(field, 0) for _, values in new]
+            self.arrays[field] = np.append(array, np.array(column,
+                                                           array.dtype))
+        self.rows = None
+
+    def row(self, sprite):
+        """ The row of the entity drawn by sprite (None if it has no
+            entity in this archetype). """
+        self.flush()
+        if self.rows is None:
+            self.rows = {s: row for row, s in enumerate(self.sprites)}
+        return self.rows.get(sprite)
+
+    def keep(self, alive):
+        """ Drop the rows that are not alive, killing their sprites. """
+        for row in np.flatnonzero(~alive):
+            self.sprites[row].kill()
+        self.sprites = [s for s, keep in zip(self.sprites, alive) if keep]
+        for field, array in self.arrays.items():
+            self.arrays[field] = array[alive]
+        self.rows = None
+
+
+def move(archetype, frames):
+    a = archetype.arrays
+    a["x"] += a["delta_x"] * frames
+    a["y"] += a["delta_y"] * frames
+
+
+def rotate(archetype, frames):
+    a = archetype.arrays
+    a["angle"] += a["delta_angle"] * frames
+
+
+def animate_scale(archetype, frames):
+    """ Grow (or shrink), turning back once past max_scale. """
+    a = archetype.arrays
+    a["scale"] += a["delta_scale"] * frames
+    turning = a["scale"] > a["max_scale"]
+    a["delta_scale"][turning] *= -1
+
+
+def cull(archetype, width):
+    """ Which entities are still alive: not shrunk away, and not off the
+        side of the screen they are heading for. """
+    a = archetype.arrays
+    alive = np.ones(len(archetype.sprites), bool)
+    scale = a["scale"] if archetype.has("scale_animation") else 1
+    if archetype.has("scale_animation"):
+        alive &= scale > 0
+    if archetype.has("bounds", "position", "velocity"):
+        half_width = a["half_width"] * scale
+        alive &= ~((a["x"] + half_width < 0) & (a["delta_x"] < 0))
+        alive &= ~((a["x"] - half_width > width) & (a["delta_x"] > 0))
+    return alive
+
+
+def sync(archetype):
+    """ Write positions, angles and scales into the sprites. Angles and
+        scales only for the entities whose angle or scale changes. """
+    a = archetype.arrays
+    sprites = archetype.sprites
+    if archetype.has("position"):
+        for sprite, position in zip(sprites, zip(a["x"].tolist(),
+                                                 a["y"].tolist())):
+            sprite.position = position
+    if archetype.has("rotation"):
+        turning = np.flatnonzero(a["delta_angle"])
+        for row, angle in zip(turning.tolist(),
+                              a["angle"][turning].tolist()):
+            sprites[row].angle = angle
+    if archetype.has("scale_animation"):
+        scaling = np.flatnonzero(a["delta_scale"])
+        for row, scale in zip(scaling.tolist(),
+                              a["scale"][scaling].tolist()):
+            sprites[row].scale = scale
+
+
+###############################################################################
+class World:
+    """ The archetypes, and the systems that run over them. """
+
+    def __init__(self, width):
+        self.width = width  # Of the screen, for culling.
+        self.archetypes = []
+
+    def archetype(self, name, *components):
+        archetype = Archetype(name, *components)
+        self.archetypes.append(archetype)
+        return archetype
+
+    def update(self, frames=1):
+        """ Run every system over every archetype with its components,
+            kill the entities that died and sync the sprites. """
+        for archetype in self.archetypes:
+            archetype.flush()
+            if not archetype.sprites:
+                continue
+            if archetype.has("position", "velocity"):
+                move(archetype, frames)
+            if archetype.has("rotation"):
+                rotate(archetype, frames)
+            if archetype.has("scale_animation"):
+                animate_scale(archetype, frames)
+            alive = cull(archetype, self.width)
+            if not alive.all():
+                archetype.keep(alive)
+            sync(archetype)
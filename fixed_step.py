@@ -0,0 +1,126 @@
+"""
+FixedStep: Run the simulation at a fixed rate, whatever the frame rate.
+    FixedTimestep turns the time each frame took into a whole number of
+    simulation steps (SIMULATION_HZ a second), carrying the remainder
+    over. After a long frame it runs at most MAX_CATCH_UP_STEPS steps and
+    drops the rest, so a slow frame can't cause an even slower one.
+    Interpolator makes a slower simulation still look smooth: when
+    drawing, each sprite is shown part of the way (alpha) between where
+    it was before the last step and where it is now. Only the positions
+    and angles in the SpriteLists' vertex data are changed, just for
+    the draw, so the sprites themselves (and hit tests) are unaffected.
+    This relies on how arcade 2.6 SpriteLists store that data.
+"""
+
+from contextlib import contextmanager
+import numpy as np
+
+SIMULATION_HZ = 30
+MAX_CATCH_UP_STEPS = 5
+
+
+###############################################################################
+class FixedTimestep:
+    """ How many fixed steps to run each frame, and how far (alpha)
+        the frame is into the next one. """
+
+    def __init__(self, hz=SIMULATION_HZ, max_steps=MAX_CATCH_UP_STEPS):
+        self.dt = 1 / hz
+        self.max_steps = max_steps
+        self.accumulator = 0.0  # Time not yet simulated.
+        self.dropped = 0.0  # Time skipped to catch up.
+
+    def advance(self, delta_time):
+        """ Add a frame's time. Returns the number of steps to run. """
+        self.accumulator += delta_time
+        steps = int(self.accumulator / self.dt)
+        if steps > self.max_steps:
+            self.dropped += (steps - self.max_steps) * self.dt
+            self.accumulator -= (steps - self.max_steps) * self.dt
+            steps = self.max_steps
+        self.accumulator -= steps * self.dt
+        return steps
+
+    @property
+    def alpha(self):
+        return min(max(self.accumulator / self.dt, 0.0), 1.0)
+
+
+def buffers(sprite_list):
+    """ Copies of a SpriteList's sprite positions (x, y per buffer slot)
+        and angles. Copies, as the buffers can't grow while viewed. """
+    return (np.frombuffer(sprite_list._sprite_pos_data,
+                          dtype="f4").reshape(-1, 2).copy(),
+            np.frombuffer(sprite_list._sprite_angle_data, dtype="f4").copy())
+
+
+def write_buffers(sprite_list, position, angle):
+    np.frombuffer(sprite_list._sprite_pos_data, dtype="f4")[
+        :position.size] = position.reshape(-1)
+    np.frombuffer(sprite_list._sprite_angle_data, dtype="f4")[
+        :angle.size] = angle
+    sprite_list._sprite_pos_changed = True
+    sprite_list._sprite_angle_changed = True
+
+
+def lives(sprite):
+    """ How many times a (pooled) sprite has been reused. """
+    return getattr(sprite, "lives", 0)
+
+
+###############################################################################
+class Interpolator:
+    """ Draws sprite lists part way between the last two steps.
+        Call before_step() and after_step() around the last step of a
+        frame (if there is one), and draw inside interpolated(alpha).
+        A sprite can move to a different buffer slot in a step (when
+        sprites are killed, added or depth sorted), so the slots are
+        matched up by sprite, once per step. New sprites are drawn
+        where they are, and so are pooled sprites killed and reused
+        within the step (their lives count has gone up), rather than
+        sliding from where they died to where they respawned. """
+
+    def __init__(self, *sprite_lists):
+        self.sprite_lists = sprite_lists
+        self.before = [None] * len(sprite_lists)  # (slots, position, angle)
+        self.matches = [None] * len(sprite_lists)  # (slots now, before)
+
+    def before_step(self):
+        self.before = [({sprite: (slot, lives(sprite))
+                         for sprite, slot in sprite_list.sprite_slot.items()},
+                        *buffers(sprite_list))
+                       for sprite_list in self.sprite_lists]
+
+    def after_step(self):
+        for i, sprite_list in enumerate(self.sprite_lists):
+            slots = self.before[i][0]
+            pairs = [(slot, slots[sprite][0])
+                     for sprite, slot in sprite_list.sprite_slot.items()
+                     if sprite in slots
+                     and slots[sprite][1] == lives(sprite)]
+            matched = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+            self.matches[i] = matched[:, 0], matched[:, 1]
+
+    @contextmanager
+    def interpolated(self, alpha):
+        """ Within the with block the sprite lists draw at alpha. """
+        current = [buffers(sprite_list) for sprite_list in self.sprite_lists]
+        for sprite_list, before, matches, (position, angle) in zip(
+                self.sprite_lists, self.before, self.matches, current):
+            if matches is None or alpha >= 1:
+                continue
+            now, then = matches
+            _, position_before, angle_before = before
+            blended_position = position.copy()
+            blended_angle = angle.copy()
+            blended_position[now] += (alpha - 1) * (position[now]
+                                                    - position_before[then])
+            blended_angle[now] += (alpha - 1) * (angle[now]
+                                                 - angle_before[then])
+            write_buffers(sprite_list, blended_position, blended_angle)
+        try:
+            yield
+        finally:
+            for sprite_list, (position, angle) in zip(self.sprite_lists,
+                                                      current):
+                write_buffers(sprite_list, position, angle)
@@ -0,0 +1,122 @@
+"""
+Footprint: Smaller sprites, and a report of how much memory they take.
+    An arcade.Sprite already sets 29 attributes in its __init__. While an
+    instance has no more than that, CPython keeps its __dict__ compact
+    (the key table is shared by every instance of the class), but the
+    first extra attribute (delta_x, tumbling, max_scale, pool...) turns
+    it into an ordinary dict, over 1KB per sprite.
+    compact() makes a variant of a sprite class that keeps its own
+    attributes in __slots__ instead, so the __dict__ stays compact.
+    The report measures, with tracemalloc:
+        - The bytes each live sprite takes, per class, by building a
+          batch of them (after one to load their textures).
+        - The current and peak memory traced over a benchmark run of
+          sprite2_meteor_performance, with the plain and the compact
+          sprites.
+Usage:
+    python footprint.py
+    python footprint.py --frames 600 --meteor-type 2
+"""
+
+import argparse
+from collections import Counter
+import tracemalloc
+
+SAMPLE_SIZE = 500  # Sprites built to measure the bytes per sprite.
+
+
+def compact(sprite_class, *names):
+    """ A subclass of sprite_class that keeps the named attributes in
+        __slots__. A name that is also a class attribute (e.g. pool) is
+        given that value first, so reading it works the same. """
+    defaults = {name: getattr(sprite_class, name) for name in names
+                if hasattr(sprite_class, name)}
+
+    def __init__(self, *args, **kwargs):
+        for name, value in defaults.items():
+            setattr(self, name, value)
+        sprite_class.__init__(self, *args, **kwargs)
+
+    return type(f"Compact{sprite_class.__name__}", (sprite_class,), {
+        "__slots__": names,
+        "__init__": __init__,
+        "__doc__": f"{sprite_class.__name__} with its own attributes in "
+                   f"__slots__ (see footprint.py).",
+        "__module__": sprite_class.__module__,
+    })
+
+
+def bytes_per_sprite(build, count=SAMPLE_SIZE):
+    """ Memory traced while building count sprites with build(), per
+        sprite. One is built first so shared textures are not counted. """
+    keep = [build()]
+    tracemalloc.start()
+    try:
+        keep.extend(build() for _ in range(count))
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return current / count
+
+
+def traced_run(make_simulation, frames, warmup):
+    """ Run a benchmark scenario under tracemalloc. Returns the current
+        and peak traced bytes, and the Simulation. """
+    from benchmark import run_scenario
+
+    simulations = []
+
+    def make(random_seed):
+        simulations.append(make_simulation(random_seed))
+        return simulations[-1]
+
+    tracemalloc.start()
+    try:
+        run_scenario(make, frames, warmup)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return current, peak, simulations[0]
+
+
+def main():
+    import sprite2_meteor_performance as module
+    from benchmark import FRAMES, WARMUP_FRAMES
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--frames", type=int, default=FRAMES)
+    parser.add_argument("--warmup", type=int, default=WARMUP_FRAMES)
+    parser.add_argument("--meteor-type", type=int, default=0,
+                        help="Index into Simulation.meteor_types")
+    args = parser.parse_args()
+
+    for compact_sprites in (False, True):
+        print("Compact sprites" if compact_sprites else "Plain sprites")
+        current, peak, simulation = traced_run(
+            lambda seed: module.Simulation(meteor_type=args.meteor_type,
+                                           compact_sprites=compact_sprites,
+                                           random_seed=seed),
+            args.frames, args.warmup)
+        meteor_class = simulation.meteor_pools[args.meteor_type].sprite_class
+        pilot_class = simulation.pilot_class
+        builders = {
+            meteor_class: meteor_class,
+            simulation.ship_class: simulation.ship_class,
+            pilot_class: lambda: pilot_class(0, 0, 0.5, 1),
+        }
+        live = Counter(type(sprite)
+                       for sprite_list in (simulation.meteor_list,
+                                           simulation.ship_list,
+                                           simulation.pilot_list)
+                       for sprite in sprite_list)
+        for sprite_class, build in builders.items():
+            size = bytes_per_sprite(build)
+            count = live[sprite_class]
+            print(f"    {sprite_class.__name__:32} {size:7.0f} bytes each "
+                  f"x {count:5} live = {size * count / 1024:8.1f}KB")
+        print(f"    Traced after {args.frames + args.warmup} frames "
+              f"{current / 2**20:.1f}MB, peak {peak / 2**20:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+FrameTimeHUD: Frame time percentiles, and what caused the slow frames.
+    An FPS graph averages away the single slow frames (hitches) that
+    are felt as stutter. This keeps the last HUD_FRAMES frame times in a
+    ring buffer and shows p50/p95/p99/max. Any frame slower than
+    HITCH_MS is remembered along with what happened in it (e.g. sprites
+    spawned, pilots ejected, sprites killed, sprites sorted), so a
+    stutter can be put down to the game event that caused it.
+Usage:
+    hud = FrameTimeHUD(10, SCREEN_HEIGHT - 10)
+    At the end of on_draw():
+        hud.draw()
+        hud.end_frame(spawned=..., ejected=...)
+"""
+
+from collections import deque
+from time import perf_counter
+import numpy as np
+import arcade
+
+HUD_FRAMES = 600  # Frame times kept for the percentiles.
+HITCH_MS = 1000/30  # Slower than this is a hitch (two frames at 60 FPS).
+HITCHES_SHOWN = 5
+REFRESH_FRAMES = 15  # Rebuilding the text every frame would cost a hitch.
+FONT_SIZE = 10
+LINE_HEIGHT = 16
+PERCENTILES = [50, 95, 99]
+
+
+###############################################################################
+class FrameTimeHUD:
+    """ Frame time percentiles and recent hitches, drawn as text. """
+
+    def __init__(self, x, top, frames=HUD_FRAMES, hitch_ms=HITCH_MS):
+        self.x = x
+        self.top = top
+        self.frame_times = np.zeros(frames)  # Ring buffer, in seconds.
+        self.frames = 0  # Frames recorded so far.
+        self.hitch_ms = hitch_ms
+        self.hitch_count = 0
+        self.hitches = deque(maxlen=HITCHES_SHOWN)  # (frame, ms, tags)
+        self.last_time = None
+        self.text = []  # arcade.Text lines, made on the first draw.
+
+    def end_frame(self, **tags):
+        """ Record the time since the last call as a frame. tags are
+            what happened in that frame, kept if it was a hitch. """
+        now = perf_counter()
+        if self.last_time is not None:
+            self.record(now - self.last_time, **tags)
+        self.last_time = now
+
+    def record(self, frame_time, **tags):
+        self.frame_times[self.frames % len(self.frame_times)] = frame_time
+        ms = frame_time * 1000
+        if ms > self.hitch_ms:
+            self.hitch_count += 1
+            self.hitches.append((self.frames, ms, tags))
+        self.frames += 1
+
+    def percentiles(self):
+        """ p50/p95/p99 and max of the frame times kept, in ms. """
+        ms = self.frame_times[:self.frames] * 1000
+        if not len(ms):
+            return {}
+        values = np.percentile(ms, PERCENTILES)
+        stats = {f"p{p}": value for p, value in zip(PERCENTILES, values)}
+        stats["max"] = ms.max()
+        return stats
+
+    def lines(self):
+        """ The HUD, as lines of text. """
+        stats = self.percentiles()
+        kept = min(self.frames, len(self.frame_times))
+        lines = [" ".join(f"{name} {ms:.1f}ms" for name, ms in stats.items())
+                 + f" ({kept} frames)",
+                 f"Hitches over {self.hitch_ms:.1f}ms: {self.hitch_count}"]
+        for frame, ms, tags in reversed(self.hitches):
+            causes = " ".join(f"{tag} {value}" for tag, value in tags.items())
+            lines.append(f"  #{frame} {ms:.1f}ms {causes}")
+        return lines
+
+    def draw(self):
+        if not self.text:
+            self.text = [arcade.Text("", self.x, self.top - LINE_HEIGHT * i,
+                                     arcade.color.WHITE, FONT_SIZE,
+                                     anchor_y="top")
+                         for i in range(2 + HITCHES_SHOWN)]
+        if self.frames % REFRESH_FRAMES == 0:
+            lines = self.lines()
+            for i, text in enumerate(self.text):
+                text.text = lines[i] if i < len(lines) else ""
+        for text in self.text:
+            text.draw()
@@ -0,0 +1,92 @@
+"""
+Headless: Run one of the Sprite2 simulations with no window.
+    Steps the simulation with a fixed dt as fast as it will go, so the
+    update hot path can be timed (or profiled) on a machine with no GPU.
+    --check-interpolation steps it the way sprite2 draws at a fixed
+    rate instead (see fixed_step.py), and checks that every sprite is
+    drawn no further from where it is than it moves in a step.
+Usage:
+    python headless.py sprite2_meteor_performance --steps 5000
+    python -m cProfile -s cumtime headless.py sprite2
+    python headless.py sprite2 --check-interpolation --dt 0.0333
+"""
+
+import argparse
+from importlib import import_module
+from math import hypot
+from time import perf_counter
+import numpy as np
+from fixed_step import Interpolator, buffers
+
+SCENARIOS = [
+    "sprite2",
+    "sprite2_meteor_performance",
+    "sprite2_spritelist_performance",
+]
+STEPS = 2000
+DT = 1/60
+RANDOM_SEED = 1
+
+
+def run(simulation, steps=STEPS, dt=DT):
+    """ Step the simulation and return the wall clock time taken. """
+    start = perf_counter()
+    for _ in range(steps):
+        simulation.step(dt)
+    return perf_counter() - start
+
+
+def check_interpolation(simulation, steps=STEPS, dt=DT, alpha=0.5,
+                        frames_per_step=1):
+    """ Step the simulation like a fixed rate frame loop, and return how
+        many sprites were drawn (at alpha) further from where they are
+        than (1 - alpha) of the way they could move in that step. """
+    sprite_lists = (simulation.meteor_list, simulation.ship_list)
+    interpolator = Interpolator(*sprite_lists)
+    strays = 0
+    for _ in range(steps):
+        interpolator.before_step()
+        simulation.step(dt)
+        simulation.depth_sort()
+        interpolator.after_step()
+        with interpolator.interpolated(alpha):
+            drawn = [buffers(sprite_list)[0] for sprite_list in sprite_lists]
+        for sprite_list, position in zip(sprite_lists, drawn):
+            for sprite, slot in sprite_list.sprite_slot.items():
+                reach = (hypot(getattr(sprite, "delta_x", 0),
+                               getattr(sprite, "delta_y", 0))
+                         * frames_per_step * (1 - alpha))
+                offset = np.hypot(*(position[slot] - sprite.position))
+                if offset > reach + 0.01:
+                    strays += 1
+    return strays
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("scenario", choices=SCENARIOS)
+    parser.add_argument("--steps", type=int, default=STEPS)
+    parser.add_argument("--dt", type=float, default=DT)
+    parser.add_argument("--seed", type=int, default=RANDOM_SEED)
+    parser.add_argument("--check-interpolation", action="store_true")
+    args = parser.parse_args()
+
+    module = import_module(args.scenario)
+    simulation = module.Simulation(random_seed=args.seed)
+    if args.check_interpolation:
+        # Speeds are per frame at SPEED_FPS, if the module scales by dt.
+        frames = args.dt * getattr(module, "SPEED_FPS", 1 / args.dt)
+        strays = check_interpolation(simulation, args.steps, args.dt,
+                                     frames_per_step=frames)
+        print(f"{args.scenario}: {strays} sprites drawn outside the "
+              f"segment they could move in a step")
+        raise SystemExit(1 if strays else 0)
+    seconds = run(simulation, args.steps, args.dt)
+    print(f"{args.scenario}: {args.steps} steps in {seconds:.2f}s "
+          f"({args.steps/seconds:.0f} steps/s) | "
+          f"Meteors {len(simulation.meteor_list)} "
+          f"Ships {len(simulation.ship_list)}")
+
+
+if __name__ == "__main__":
+    main()
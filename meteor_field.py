@@ -0,0 +1,105 @@
+"""
+MeteorField: Move a whole field of meteors in one go with NumPy.
+    The meteor sprites only hold what is needed to draw them.
+    Position, speed and rotation live in arrays (struct-of-arrays), so
+    a frame is one vectorized step, one boolean mask to cull off screen
+    meteors and one pass to copy the results back to the sprites.
+    Given a ParallelUpdater (see parallel_update.py) the vectorized step
+    is split into chunks that run on a thread pool.
+"""
+
+from math import hypot
+import numpy as np
+
+
+###############################################################################
+class MeteorField:
+    """ Vectorized replacement for calling Meteor.update() on every meteor.
+        Meteors move right to left, so they are culled once their right
+        edge has gone past the left edge of the screen. """
+
+    def __init__(self, sprite_list, updater=None):
+        self.sprite_list = sprite_list  # Where the meteors get drawn from.
+        self.updater = updater
+        self.sprites = []
+        self.new_sprites = []  # Added since the last update.
+
+        self.x = np.zeros(0)
+        self.delta_x = np.zeros(0)
+        self.angle = np.zeros(0)
+        self.delta_angle = np.zeros(0)
+        self.radius = np.zeros(0)  # Centre to right edge, for culling.
+
+    def __len__(self):
+        return len(self.sprites) + len(self.new_sprites)
+
+    def append(self, meteor):
+        """ Add a meteor to the field (and to the sprite list for drawing).
+            Its arrays are built in bulk at the start of the next update. """
+        self.new_sprites.append(meteor)
+        self.sprite_list.append(meteor)
+
+    def add_new_sprites(self):
+        """ Move newly added meteors into the arrays. """
+        new = self.new_sprites
+        self.new_sprites = []
+
+        delta_angle = [getattr(m, "delta_angle", 0) for m in new]
+        # A rotating meteor may reach further right than half its width.
+        radius = [hypot(m.width, m.height)/2 if da else m.width/2
+                  for m, da in zip(new, delta_angle)]
+
+        self.sprites.extend(new)
+        self.x = np.append(self.x, [m.center_x for m in new])
+        self.delta_x = np.append(self.delta_x, [m.delta_x for m in new])
+        self.angle = np.append(self.angle, [m.angle for m in new])
+        self.delta_angle = np.append(self.delta_angle, delta_angle)
+        self.radius = np.append(self.radius, radius)
+
+    def update(self):
+        """ Move and rotate every meteor, then kill the ones off screen. """
+        if self.new_sprites:
+            self.add_new_sprites()
+        if not self.sprites:
+            return
+
+        if self.updater:
+            alive = np.concatenate(self.updater.map(self.step, len(self.x)))
+        else:
+            alive = self.step(0, len(self.x))
+
+        # Kill if off screen.
+        if not alive.all():
+            for i in np.flatnonzero(~alive):
+                self.sprites[i].kill()
+            self.sprites = [s for s, keep in zip(self.sprites, alive) if keep]
+            self.x = self.x[alive]
+            self.delta_x = self.delta_x[alive]
+            self.angle = self.angle[alive]
+            self.delta_angle = self.delta_angle[alive]
+            self.radius = self.radius[alive]
+
+        self.push_to_sprites()
+
+    def step(self, start, stop):
+        """ Move and rotate the meteors from start to stop. Returns which
+            of them are still on screen. """
+        x = self.x[start:stop]
+        x += self.delta_x[start:stop]
+        angle = self.angle[start:stop]
+        angle += self.delta_angle[start:stop]
+        return x + self.radius[start:stop] >= 0
+
+    def push_to_sprites(self):
+        """ Copy the new positions (and angles) back to the sprites.
+            Only meteors that actually rotate have their angle set. """
+        sprites = self.sprites
+        for sprite, x in zip(sprites, self.x.tolist()):
+            sprite.center_x = x
+
+        rotating = np.flatnonzero(self.delta_angle)
+        for i, angle in zip(rotating.tolist(), self.angle[rotating].tolist()):
+            sprites[i].angle = angle
+
+    def close(self):
+        """ Nothing to free. (A SharedMeteorField stops its worker.) """
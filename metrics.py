@@ -0,0 +1,123 @@
+"""
+Metrics: Where does the time in a frame go?
+    FrameMetrics times named phases of a frame (update, spawn, sort,
+    draw, input, ...) and counts things that happened in it (sprites
+    created and killed, or anything else). At the end of each frame the
+    totals become one record, kept in last and optionally written to a
+    file as a line of JSON.
+    Turned off, timer() hands back the same do-nothing context manager
+    and count() returns straight away, so it can be left in the game.
+Usage:
+    metrics = FrameMetrics(filename="metrics.jsonl")
+    with metrics.timer("update"):
+        simulation.update()
+    metrics.sprites(simulation.sprite_counts)
+    metrics.end_frame()
+"""
+
+from contextlib import nullcontext
+import json
+from time import perf_counter
+
+METRICS_ENABLED = True
+
+NULL_TIMER = nullcontext()
+
+
+###############################################################################
+class PhaseTimer:
+    """ Adds the time spent inside a with block to times[phase]. """
+
+    def __init__(self, times, phase):
+        self.times = times
+        self.phase = phase
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = perf_counter() - self.start
+        self.times[self.phase] = self.times.get(self.phase, 0.0) + elapsed
+
+
+###############################################################################
+class FrameMetrics:
+    """ Per frame phase timings and counters.
+        A phase (or counter) used more than once in a frame is summed. """
+
+    def __init__(self, enabled=METRICS_ENABLED, filename=None):
+        self.enabled = enabled
+        self.frame = 0
+        self.times = {}  # phase -> seconds, this frame.
+        self.counters = {}  # counter -> amount, this frame.
+        self.timers = {}  # phase -> PhaseTimer, reused every frame.
+        self.sprite_counts = None  # From the last call to sprites().
+        self.last = None  # The record of the last finished frame.
+        self.file = open(filename, "w") if enabled and filename else None
+
+    def timer(self, phase):
+        """ A context manager that times a phase of the frame. """
+        if not self.enabled:
+            return NULL_TIMER
+        try:
+            return self.timers[phase]
+        except KeyError:
+            timer = self.timers[phase] = PhaseTimer(self.times, phase)
+            return timer
+
+    def count(self, counter, amount=1):
+        if self.enabled:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def sprites(self, sprite_counts):
+        """ Count sprites created and killed since the last call.
+            sprite_counts() returns a dict of kind -> number alive, and
+            is only called when enabled. Call it after each phase that
+            only creates, or only kills, sprites. """
+        if not self.enabled:
+            return
+        counts = sprite_counts()
+        previous = self.sprite_counts
+        self.sprite_counts = counts
+        if previous is None:
+            return
+        for kind, alive in counts.items():
+            change = alive - previous.get(kind, 0)
+            if change > 0:
+                self.count(f"{kind}_created", change)
+            elif change < 0:
+                self.count(f"{kind}_killed", -change)
+
+    def end_frame(self):
+        """ Finish the frame's record, write it out and start again. """
+        if not self.enabled:
+            return
+        self.last = {
+            "frame": self.frame,
+            "phases_ms": {phase: round(seconds * 1000, 4)
+                          for phase, seconds in self.times.items()},
+            "counters": dict(self.counters),
+            "sprites": dict(self.sprite_counts or {}),
+        }
+        if self.file:
+            self.file.write(json.dumps(self.last) + "\n")
+        self.frame += 1
+        self.times.clear()
+        self.counters.clear()
+
+    def summary(self):
+        """ One line summary of the last frame, for the F1 debug info. """
+        if not self.last:
+            return "Metrics: no frames recorded"
+        phases = " ".join(f"{phase} {ms:.2f}ms" for phase, ms
+                          in self.last["phases_ms"].items())
+        counters = " ".join(f"{counter} {amount}" for counter, amount
+                            in self.last["counters"].items())
+        return f"Frame {self.last['frame']}: {phases} | {counters}"
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,64 @@
+"""
+ParallelUpdater: Update big sprite lists (or arrays) in chunks on threads.
+    The list is split into one chunk per worker and an update kernel is
+    run on each chunk on a concurrent.futures thread pool.
+        - NumPy kernels (e.g. MeteorField.step) release the GIL while
+          they work, so their chunks really do run at the same time.
+        - Plain Python kernels (sprite.advance()) only run at the same
+          time on a free-threaded Python build. On any other build they
+          take turns, but still give the same results.
+    A kernel never kills a sprite, it only reports which ones should
+    die. The kills are applied on the main thread after every chunk has
+    finished, in list order, so the result is the same for any number of
+    workers, including none (everything in the calling thread).
+    SpriteList.update() kills as it goes, which makes the list shift
+    under it and skip the next sprite for that frame, so it is not quite
+    the same as any of these.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+PARALLEL_WORKERS = 0  # 0 updates in the calling thread.
+MIN_CHUNK = 256  # Smaller chunks cost more to hand out than they save.
+
+
+###############################################################################
+class ParallelUpdater:
+    """ Runs kernel(start, stop) over chunks of a list, on a thread pool. """
+
+    def __init__(self, workers=PARALLEL_WORKERS, min_chunk=MIN_CHUNK):
+        self.workers = workers
+        self.min_chunk = min_chunk
+        self.executor = ThreadPoolExecutor(workers) if workers else None
+
+    def chunks(self, count):
+        """ (start, stop) of each chunk of a list of count items. """
+        chunks = max(1, min(self.workers, count // self.min_chunk))
+        size = -(-count // chunks)  # Round up.
+        return [(start, min(start + size, count))
+                for start in range(0, count, size)]
+
+    def map(self, kernel, count):
+        """ kernel(start, stop) for every chunk, results in chunk order. """
+        if not self.executor or count < self.min_chunk * 2:
+            return [kernel(0, count)]
+        starts, stops = zip(*self.chunks(count))
+        return list(self.executor.map(kernel, starts, stops))
+
+    def update_sprites(self, sprite_list):
+        """ Call advance() on every sprite, then kill the ones that
+            returned False. """
+        sprites = sprite_list.sprite_list
+
+        def kernel(start, stop):
+            return [sprite for sprite in sprites[start:stop]
+                    if not sprite.advance()]
+
+        for dead in self.map(kernel, len(sprites)):
+            for sprite in dead:
+                sprite.kill()
+
+    def close(self):
+        if self.executor:
+            self.executor.shutdown()
+            self.executor = None
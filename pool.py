@@ -0,0 +1,82 @@
+"""
+Pool: Reuse killed sprites instead of building new ones.
+    Constructing a sprite looks up its texture and works out its hit box.
+    A pooled sprite keeps both, so getting one back from the pool only
+    has to reset its position, speed, scale etc.
+Usage:
+    class Meteor(PooledSprite, arcade.Sprite):
+        def reset(self): ...  # Everything that changes per life.
+
+    meteor_pool = SpritePool(Meteor, MAX_METEORS)
+    meteor_list.append(meteor_pool.get())
+    ...
+    meteor.kill()  # Back in the pool, ready for the next get().
+"""
+
+from functools import lru_cache
+import arcade
+
+
+###############################################################################
+class PooledSprite:
+    """ Mixin for sprites that go back to their pool when killed.
+        Must come before arcade.Sprite in the list of base classes. """
+
+    pool = None
+    lives = 0  # Times it has been reused, so a respawn can be told apart.
+
+    def kill(self):
+        alive = bool(self.sprite_lists)
+        super().kill()
+        if alive and self.pool is not None:
+            self.pool.release(self)
+
+
+@lru_cache(maxsize=None)
+def circle_texture(radius, color):
+    """ A (cached) circle texture, so a reused SpriteCircle can be given
+        a new size without building a new sprite. """
+    return arcade.make_circle_texture(radius*2, color)
+
+
+###############################################################################
+class SpritePool:
+    """ Hands out sprites of one class, reusing killed ones if it can.
+        At most size killed sprites are kept (a size of 0 turns pooling
+        off). Any extra arguments to get() are passed on to the sprite's
+        __init__() for a new sprite, or reset() for a reused one. """
+
+    def __init__(self, sprite_class, size):
+        self.sprite_class = sprite_class
+        self.size = size
+        self.free = []
+        self.hits = 0  # Sprites reused.
+        self.misses = 0  # Sprites built from scratch.
+
+    def __len__(self):
+        return len(self.free)
+
+    def get(self, *args):
+        if self.free:
+            self.hits += 1
+            sprite = self.free.pop()
+            sprite.lives += 1
+            sprite.reset(*args)
+        else:
+            self.misses += 1
+            sprite = self.sprite_class(*args)
+            if self.size:
+                sprite.pool = self
+        return sprite
+
+    def release(self, sprite):
+        if len(self.free) < self.size:
+            self.free.append(sprite)
+
+    def stats(self):
+        """ One line summary, for the F1 debug info. """
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total else 0
+        return (f"{self.sprite_class.__name__} pool: "
+                f"hits {self.hits} misses {self.misses} "
+                f"({hit_rate:.0f}%) free {len(self.free)}/{self.size}")
@@ -0,0 +1,86 @@
+"""
+Population: Let the frame rate decide how many sprites there are.
+    Instead of hard coded MAX_... constants that are too low for a fast
+    machine and too high for a slow one, the caps (and spawn counts) are
+    multiplied by a scale. PopulationController watches the frame time
+    and nudges the scale up while frames are quick, and down when they
+    are too slow for the target FPS.
+    The frame time is the work done in the frame (update and draw, timed
+    with timed()), not on_update's delta_time: arcade pins that near its
+    update rate however quick the frame was, so the scale could never
+    grow.
+    Hysteresis:
+        - Nothing changes while the average frame time is in the band
+          between FAST and SLOW (as a fraction of the target).
+        - After every change it waits for a fresh window of frames.
+        - It shrinks quickly but grows slowly.
+"""
+
+from collections import deque
+from contextlib import contextmanager
+from time import perf_counter
+
+TARGET_FPS = 60
+WINDOW_FRAMES = 60  # Frames averaged before deciding anything.
+SLOW = 1.05  # Shrink if frames average more than 105% of the target time.
+FAST = 0.85  # Grow if frames average less than 85% of the target time.
+GROW = 1.05
+SHRINK = 0.8
+MIN_SCALE = 0.05
+MAX_SCALE = 20
+
+
+###############################################################################
+class PopulationController:
+    """ Scales entity caps and spawn counts to hold a target frame rate.
+        Time the work of each frame with timed() and call end_frame()
+        once it is drawn, or call record() with the time each frame
+        took. """
+
+    def __init__(self, target_fps=TARGET_FPS, window=WINDOW_FRAMES):
+        self.target_fps = target_fps
+        self.target_time = 1 / target_fps
+        self.frame_times = deque(maxlen=window)
+        self.scale = 1.0
+        self.busy = 0.0  # Time spent in timed() blocks this frame.
+
+    @contextmanager
+    def timed(self):
+        """ Count the time spent in the with block as frame time. """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.busy += perf_counter() - start
+
+    def end_frame(self):
+        """ Record the time timed() this frame as the frame's time. """
+        self.record(self.busy)
+        self.busy = 0.0
+
+    def record(self, frame_time):
+        self.frame_times.append(frame_time)
+        if len(self.frame_times) < self.frame_times.maxlen:
+            return
+
+        mean = sum(self.frame_times) / len(self.frame_times)
+        if mean > self.target_time * SLOW and self.scale > MIN_SCALE:
+            self.scale = max(self.scale * SHRINK, MIN_SCALE)
+            self.frame_times.clear()
+        elif mean < self.target_time * FAST and self.scale < MAX_SCALE:
+            self.scale = min(self.scale * GROW, MAX_SCALE)
+            self.frame_times.clear()
+
+    def cap(self, value):
+        """ A cap (or spawn count) scaled to what the machine can manage.
+            Never less than 1, so something always happens. """
+        return max(1, round(value * self.scale))
+
+    def stats(self, **caps):
+        """ One line summary of the given caps, for the F1 debug info. """
+        times = self.frame_times
+        mean = sum(times) / len(times) * 1000 if times else 0
+        scaled = " ".join(f"{name} {self.cap(value)}"
+                          for name, value in caps.items())
+        return (f"Caps x{self.scale:.2f}: {scaled} | "
+                f"frame {mean:.1f}ms (target {self.target_time*1000:.1f}ms)")
@@ -0,0 +1,106 @@
+"""
+Removal: Kill sprites during an update, remove them all in one go after.
+    SpriteList.remove() searches for the sprite in the list and in the
+    index buffer, and shifts everything after it along, so killing a
+    wave of sprites costs a pass over the list per sprite. (kill() even
+    checks "sprite in sprite_list" first, another pass.)
+    Inside deferred_removal(), kill() only marks the sprite as dead in
+    a BatchedRemovalSpriteList. When the block ends, each list drops
+    its dead sprites in one pass, keeping the rest in order (which
+    depth sorted lists, and the draw order, rely on).
+    Until then a dead sprite is still in the list: it is still iterated
+    over (and would still be drawn), but has already left any subclass
+    bookkeeping (depth sort, spatial index) and doesn't count in len().
+    Iterating over a list no longer skips the sprite after a killed one.
+Usage:
+    class ShipList(IndexedSpriteList, DepthSortedSpriteList,
+                   BatchedRemovalSpriteList): ...  # Last, if combined.
+
+    with deferred_removal(meteor_list, ship_list):
+        meteor_list.update()
+        ship_list.update()
+"""
+
+from array import array
+from contextlib import contextmanager
+import arcade
+
+
+###############################################################################
+class BatchedRemovalSpriteList(arcade.SpriteList):
+    """ A SpriteList that can save up removals and do them all at once.
+        When combined with other SpriteList subclasses it must come last,
+        so their remove() bookkeeping still happens straight away. """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.deferring = False
+        self.dead = {}  # Sprites to remove, in the order they died.
+
+    def __len__(self):
+        return len(self.sprite_list) - len(self.dead)
+
+    def __contains__(self, sprite):
+        return sprite in self.sprite_slot and sprite not in self.dead
+
+    def append(self, sprite):
+        if sprite in self.dead:  # Killed and reused in the same update.
+            self.remove_dead()
+        super().append(sprite)
+
+    def insert(self, index, sprite):
+        if sprite in self.dead:
+            self.remove_dead()
+        super().insert(index, sprite)
+
+    def remove(self, sprite):
+        if not self.deferring:
+            super().remove(sprite)
+            return
+        if sprite not in self:
+            raise ValueError("Sprite is not in the SpriteList")
+        # The sprite forgets the list now, so it won't be killed twice or
+        # keep updating the list's buffers.
+        sprite.sprite_lists.remove(self)
+        self.dead[sprite] = None
+
+    def remove_dead(self):
+        """ Remove every dead sprite in one pass over the list. """
+        dead = self.dead
+        if not dead:
+            return
+        self.dead = {}
+
+        slots = self.sprite_slot
+        free_slots = self._sprite_buffer_free_slots
+        for sprite in dead:
+            free_slots.append(slots.pop(sprite))
+            if self.spatial_hash:
+                self.spatial_hash.remove_object(sprite)
+
+        old_count = len(self.sprite_list)
+        self.sprite_list = [sprite for sprite in self.sprite_list
+                            if sprite in slots]
+        count = len(self.sprite_list)
+        index_data = self._sprite_index_data
+        index_data[:count] = array(index_data.typecode,
+                                   [slots[sprite]
+                                    for sprite in self.sprite_list])
+        index_data[count:old_count] = array(index_data.typecode,
+                                            [0] * (old_count - count))
+        self._sprite_index_slots = count
+        self._sprite_index_changed = True
+
+
+@contextmanager
+def deferred_removal(*sprite_lists):
+    """ Within the with block, sprites killed from these lists are only
+        marked as dead. They are all removed when the block ends. """
+    for sprite_list in sprite_lists:
+        sprite_list.deferring = True
+    try:
+        yield
+    finally:
+        for sprite_list in sprite_lists:
+            sprite_list.deferring = False
+            sprite_list.remove_dead()
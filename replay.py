@@ -0,0 +1,146 @@
+"""
+Replay: Record a run of sprite2_meteor_performance and play it back.
+    Every spawn comes from the global random module, and the load also
+    depends on when the keys and mouse were pressed, so no two runs are
+    the same. A recording is a JSON lines file:
+        - A header with the random seed, the fixed timestep and every
+          Simulation setting (its settings dict).
+        - One line per frame with the simulation time, the inputs that
+          happened before it (as Simulation method calls), the spawn
+          decisions (the population scale and, if amortized, how many
+          sprites each emitter spawned) and the sprite counts after it.
+    Replaying seeds the Simulation the same way, feeds the frames back
+    with the same fixed timestep and checks the sprite counts still
+    match, so the same frames can be timed before and after a change.
+Usage:
+    Set RECORD_FILE in sprite2_meteor_performance.py and play, then
+    python replay.py recording.jsonl
+    python replay.py recording.jsonl --json replay.json
+"""
+
+import argparse
+import json
+from time import perf_counter
+import numpy as np
+
+PERCENTILES = [50, 95, 99]
+
+
+###############################################################################
+class Recorder:
+    """ Writes a recording of a Simulation as it runs.
+        Call event() for each input (before it is applied) and frame()
+        after each step. """
+
+    def __init__(self, filename, random_seed, dt, **settings):
+        self.file = open(filename, "w")
+        self.frame_number = 0
+        self.events = []  # Since the last frame.
+        header = {"seed": random_seed, "dt": dt, "settings": settings}
+        self.file.write(json.dumps(header) + "\n")
+
+    def event(self, name, *args):
+        """ A Simulation method call, e.g. event("eject_all_pilots"). """
+        self.events.append([name, *args])
+
+    def frame(self, simulation):
+        spawner = simulation.spawner
+        record = {
+            "frame": self.frame_number,
+            "time": simulation.time,
+            "events": self.events,
+            "scale": simulation.population.scale,
+            "spawns": spawner.last_counts if spawner else None,
+            "sprites": simulation.sprite_counts(),
+        }
+        self.file.write(json.dumps(record) + "\n")
+        self.frame_number += 1
+        self.events = []
+
+    def close(self):
+        self.file.close()
+
+
+###############################################################################
+class Replayer:
+    """ Plays a recording back into a Simulation, one frame per step(). """
+
+    def __init__(self, filename):
+        with open(filename) as f:
+            self.header = json.loads(f.readline())
+            self.frames = [json.loads(line) for line in f]
+        self.dt = self.header["dt"]
+        self.frame_number = 0
+        self.diverged = None  # First frame whose sprite counts differ.
+
+    def __len__(self):
+        return len(self.frames)
+
+    def done(self):
+        return self.frame_number >= len(self.frames)
+
+    def simulation(self, simulation_class):
+        """ A Simulation set up (and seeded) like the recorded one. """
+        return simulation_class(random_seed=self.header["seed"],
+                                **self.header["settings"])
+
+    def step(self, simulation):
+        """ Apply the next frame's inputs, then step with its spawns. """
+        frame = self.frames[self.frame_number]
+        for name, *args in frame["events"]:
+            getattr(simulation, name)(*args)
+        simulation.population.scale = frame["scale"]
+        simulation.update()
+        simulation.time += self.dt
+        simulation.spawn(frame["spawns"])
+
+        if (self.diverged is None
+                and simulation.sprite_counts() != frame["sprites"]):
+            self.diverged = self.frame_number
+        self.frame_number += 1
+
+
+def replay(filename):
+    """ Replay a recording headless. Returns the time (in seconds) each
+        frame took and the first frame that diverged (or None). """
+    import sprite2_meteor_performance
+
+    replayer = Replayer(filename)
+    simulation = replayer.simulation(sprite2_meteor_performance.Simulation)
+    times = []
+    while not replayer.done():
+        start = perf_counter()
+        replayer.step(simulation)
+        # Sort every frame, like on_draw(): the order ships are in
+        # decides the order their pilots use up random numbers.
+        simulation.depth_sort()
+        times.append(perf_counter() - start)
+    return times, replayer.diverged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("recording")
+    parser.add_argument("--json", help="Write the frame time stats here")
+    args = parser.parse_args()
+
+    times, diverged = replay(args.recording)
+    ms = np.array(times) * 1000
+    stats = {"frames": len(ms), "mean_ms": ms.mean()}
+    for p in PERCENTILES:
+        stats[f"p{p}_ms"] = np.percentile(ms, p)
+    stats["max_ms"] = ms.max()
+    stats = {k: round(float(v), 4) for k, v in stats.items()}
+    stats["diverged_at_frame"] = diverged
+
+    print(" ".join(f"{k} {v}" for k, v in stats.items()))
+    if diverged is not None:
+        print(f"Warning: the sprite counts no longer match the recording "
+              f"from frame {diverged}, so the runs are not comparable.")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(stats, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+RotationCache: Pre-rotated copies of a texture, one per bucket of angles.
+    A sprite that only ever shows one of N angles can swap to a texture
+    (and hit box) that was rotated once, up front, instead of being
+    rotated (and having its hit box rotated) every time its angle changes.
+    The price is that the angle is only accurate to within half a bucket:
+    more buckets look smoother but use more texture atlas space.
+    See benchmark.py --rotation-buckets for the trade off per N.
+"""
+
+from PIL import Image
+import arcade
+
+ROTATION_BUCKETS = 32
+
+
+###############################################################################
+class RotationCache:
+    """ Rotated textures, built the first time they're asked for. """
+
+    def __init__(self, buckets=ROTATION_BUCKETS):
+        self.buckets = buckets
+        self.step = 360 / buckets  # Degrees per bucket.
+        self.rotations = {}  # texture name -> [texture for each bucket]
+
+    def bucket(self, angle):
+        """ The bucket nearest to an angle (in degrees). """
+        return round(angle / self.step) % self.buckets
+
+    def textures(self, texture):
+        """ All the rotations of a texture, by bucket. """
+        try:
+            return self.rotations[texture.name]
+        except KeyError:
+            textures = [self.rotate(texture, bucket)
+                        for bucket in range(self.buckets)]
+            self.rotations[texture.name] = textures
+            return textures
+
+    def rotate(self, texture, bucket):
+        angle = bucket * self.step
+        image = texture.image.rotate(angle, resample=Image.BICUBIC,
+                                     expand=True)
+        rotated = arcade.Texture(f"{texture.name}-{bucket}of{self.buckets}",
+                                 image)
+        rotated.hit_box_points  # Work out the hit box now, not mid-game.
+        return rotated
@@ -0,0 +1,200 @@
+"""
+SharedMeteorField: A MeteorField whose meteors are moved by another process.
+    The meteor positions and angles are worked out in a worker process
+    and written to shared memory (multiprocessing.shared_memory), so the
+    main process only has to copy them onto the sprites and draw.
+    Double buffered: the worker writes each step into the buffer the
+    main process is not reading, then (under a lock) makes it the
+    latest. The main process copies the latest completed snapshot
+    (under the same lock) and never waits for the worker.
+    Only one step is ever asked for at a time: while the worker is still
+    on one, new meteors wait for the next. So if the worker is slower
+    than the frame rate the meteors move less often, but no queue of
+    steps builds up behind it, and what is shown is at most a step old.
+    Each meteor has a slot in the arrays. A slot's generation goes up
+    every time it is reused, so a snapshot taken before the worker
+    heard about a new meteor is never mistaken for that meteor.
+    The sprites are a frame (or so) behind the worker, and the worker
+    may fall behind the frame rate, so this is not exactly the same as
+    MeteorField.
+"""
+
+from math import hypot
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+
+SHARED_CAPACITY = 50000  # Most meteors alive at once.
+
+# One meteor in a snapshot.
+SNAPSHOT = np.dtype([("x", "f8"), ("angle", "f8"), ("generation", "i8"),
+                     ("alive", "?")])
+# A new meteor, sent to the worker.
+NEW_METEOR = np.dtype([("slot", "i8"), ("generation", "i8"), ("x", "f8"),
+                       ("delta_x", "f8"), ("angle", "f8"),
+                       ("delta_angle", "f8"), ("radius", "f8")])
+# Per buffer: the step it holds and the number of slots in use.
+HEADER = np.dtype([("step", "i8"), ("top", "i8")])
+
+
+def buffers(shm, capacity):
+    """ The two headers and two snapshots in a shared memory block. """
+    headers = np.ndarray(2, HEADER, buffer=shm.buf)
+    snapshots = np.ndarray((2, capacity), SNAPSHOT, buffer=shm.buf,
+                           offset=headers.nbytes)
+    return headers, snapshots
+
+
+def run_worker(name, capacity, commands, latest):
+    """ The worker process. Each message is a NEW_METEOR array of meteors
+        to add before stepping every meteor once. None stops it. """
+    shm = shared_memory.SharedMemory(name=name)
+    headers, snapshots = buffers(shm, capacity)
+    x = np.zeros(capacity)
+    delta_x = np.zeros(capacity)
+    angle = np.zeros(capacity)
+    delta_angle = np.zeros(capacity)
+    radius = np.zeros(capacity)
+    generation = np.zeros(capacity, dtype=np.int64)
+    active = np.zeros(capacity, dtype=bool)
+    top = 0  # Slots in use are all below this.
+    step = 0
+
+    while (new := commands.get()) is not None:
+        if len(new):
+            slots = new["slot"]
+            x[slots] = new["x"]
+            delta_x[slots] = new["delta_x"]
+            angle[slots] = new["angle"]
+            delta_angle[slots] = new["delta_angle"]
+            radius[slots] = new["radius"]
+            generation[slots] = new["generation"]
+            active[slots] = True
+            top = max(top, int(slots.max()) + 1)
+
+        x[:top] += delta_x[:top]
+        angle[:top] += delta_angle[:top]
+        alive = active[:top] & (x[:top] + radius[:top] >= 0)
+        step += 1
+
+        back = 1 - latest.value  # Only the worker changes latest.
+        snapshot = snapshots[back]
+        snapshot["x"][:top] = x[:top]
+        snapshot["angle"][:top] = angle[:top]
+        snapshot["generation"][:top] = generation[:top]
+        snapshot["alive"][:top] = alive
+        headers[back] = (step, top)
+        with latest.get_lock():
+            latest.value = back
+        active[:top] = alive
+
+    del headers, snapshots  # Let go of the shared memory before closing.
+    shm.close()
+
+
+###############################################################################
+class SharedMeteorField:
+    """ Same use as MeteorField: append() meteors, update() every frame,
+        and close() when finished with it to stop the worker. """
+
+    def __init__(self, sprite_list, capacity=SHARED_CAPACITY):
+        self.sprite_list = sprite_list
+        self.capacity = capacity
+        self.slots = [None] * capacity  # The sprite in each slot.
+        self.free = list(range(capacity - 1, -1, -1))  # Lowest slot last.
+        self.generation = np.zeros(capacity, dtype=np.int64)
+        self.rotating = np.zeros(capacity, dtype=bool)
+        self.new_sprites = []
+        self.alive = 0
+        self.last_step = 0  # The last step shown.
+        self.requested = 0  # The last step asked for.
+
+        size = HEADER.itemsize * 2 + SNAPSHOT.itemsize * 2 * capacity
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.headers, self.snapshots = buffers(self.shm, capacity)
+        self.headers[:] = (0, 0)
+
+        context = multiprocessing.get_context("spawn")
+        self.latest = context.Value("i", 0)
+        self.commands = context.Queue()
+        self.worker = context.Process(
+            target=run_worker, daemon=True,
+            args=(self.shm.name, capacity, self.commands, self.latest))
+        self.worker.start()
+
+    def __len__(self):
+        return self.alive + len(self.new_sprites)
+
+    def append(self, meteor):
+        """ Add a meteor to the field (and to the sprite list for drawing).
+            The worker is told about it on the next update. """
+        self.new_sprites.append(meteor)
+        self.sprite_list.append(meteor)
+
+    def add_new_sprites(self):
+        """ Give each new meteor a slot, and describe them for the worker.
+            Any there is no room for are killed straight away. """
+        new_sprites = self.new_sprites[:len(self.free)]
+        for meteor in self.new_sprites[len(self.free):]:
+            meteor.kill()
+        self.new_sprites = []
+        new = np.zeros(len(new_sprites), NEW_METEOR)
+        for i, meteor in enumerate(new_sprites):
+            slot = self.free.pop()
+            self.slots[slot] = meteor
+            self.generation[slot] += 1
+            delta_angle = getattr(meteor, "delta_angle", 0)
+            self.rotating[slot] = delta_angle != 0
+            # A rotating meteor may reach further right than half its width.
+            radius = (hypot(meteor.width, meteor.height)/2 if delta_angle
+                      else meteor.width/2)
+            new[i] = (slot, self.generation[slot], meteor.center_x,
+                      meteor.delta_x, meteor.angle, delta_angle, radius)
+        self.alive += len(new_sprites)
+        return new
+
+    def update(self):
+        """ Ask the worker for the next step (unless it is still working
+            on one), then show the latest one it has finished (if it is
+            new). """
+        with self.latest.get_lock():
+            latest = self.latest.value
+            step, top = self.headers[latest]
+            snapshot = self.snapshots[latest][:top].copy()
+        if step == self.requested:
+            self.commands.put(self.add_new_sprites())
+            self.requested += 1
+
+        if step == self.last_step:
+            return
+        self.last_step = step
+
+        # Only slots the worker knows hold their current meteor.
+        current = snapshot["generation"] == self.generation[:top]
+        slots = self.slots
+        for slot in np.flatnonzero(current & ~snapshot["alive"]).tolist():
+            slots[slot].kill()
+            slots[slot] = None
+            self.generation[slot] += 1  # Ignore it in older snapshots.
+            self.free.append(slot)
+            self.alive -= 1
+
+        moving = np.flatnonzero(current & snapshot["alive"])
+        for slot, x in zip(moving.tolist(), snapshot["x"][moving].tolist()):
+            slots[slot].center_x = x
+
+        rotating = moving[self.rotating[moving]]
+        for slot, angle in zip(rotating.tolist(),
+                               snapshot["angle"][rotating].tolist()):
+            slots[slot].angle = angle
+
+    def close(self):
+        """ Stop the worker and free the shared memory. """
+        if self.worker is None:
+            return
+        self.commands.put(None)
+        self.worker.join()
+        self.worker = None
+        del self.headers, self.snapshots
+        self.shm.close()
+        self.shm.unlink()
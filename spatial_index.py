@@ -0,0 +1,120 @@
+"""
+SpatialIndex: A uniform grid of cells, each holding the sprites over it.
+    Finding the sprites at a point (or in a rectangle) only has to look
+    at the sprites in the cells it covers, so the cost depends on how
+    crowded that part of the screen is, not on the total sprite count.
+    IndexedSpriteList keeps the index up to date: a sprite tells its
+    spritelists when it moves or changes size, and only then (and only
+    if it has crossed into different cells) is the index changed.
+"""
+
+from math import hypot
+import arcade
+
+CELL_SIZE = 64
+
+
+###############################################################################
+class SpatialIndex:
+    """ Sprites by grid cell. Each sprite is held in every cell its
+        bounding circle overlaps, so any rotation is covered. """
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}  # (x, y) cell -> {sprite: None}, in insertion order.
+        self.sprite_cells = {}  # sprite -> (x1, y1, x2, y2) cells covered.
+
+    def __len__(self):
+        return len(self.sprite_cells)
+
+    def cell_range(self, sprite):
+        radius = hypot(sprite.width, sprite.height) / 2
+        x, y = sprite.position
+        size = self.cell_size
+        return (int((x - radius) // size), int((y - radius) // size),
+                int((x + radius) // size), int((y + radius) // size))
+
+    def move(self, sprite):
+        """ Add the sprite, or update its cells if it has moved. """
+        cells = self.cell_range(sprite)
+        old_cells = self.sprite_cells.get(sprite)
+        if cells == old_cells:
+            return
+        if old_cells:
+            self.remove_from_cells(sprite, old_cells)
+        self.sprite_cells[sprite] = cells
+
+        x1, y1, x2, y2 = cells
+        for x in range(x1, x2 + 1):
+            for y in range(y1, y2 + 1):
+                self.cells.setdefault((x, y), {})[sprite] = None
+
+    def remove(self, sprite):
+        cells = self.sprite_cells.pop(sprite, None)
+        if cells:
+            self.remove_from_cells(sprite, cells)
+
+    def remove_from_cells(self, sprite, cells):
+        x1, y1, x2, y2 = cells
+        for x in range(x1, x2 + 1):
+            for y in range(y1, y2 + 1):
+                cell = self.cells[(x, y)]
+                del cell[sprite]
+                if not cell:
+                    del self.cells[(x, y)]
+
+    def query_point(self, x, y):
+        """ The sprites whose hit box contains the point. """
+        size = self.cell_size
+        cell = self.cells.get((int(x // size), int(y // size)), {})
+        return [sprite for sprite in cell
+                if sprite.collides_with_point((x, y))]
+
+    def query_rect(self, left, right, bottom, top):
+        """ The sprites whose hit box overlaps the rectangle. """
+        size = self.cell_size
+        found = {}
+        for x in range(int(left // size), int(right // size) + 1):
+            for y in range(int(bottom // size), int(top // size) + 1):
+                found.update(self.cells.get((x, y), {}))
+        return [sprite for sprite in found
+                if sprite.right >= left and sprite.left <= right
+                and sprite.top >= bottom and sprite.bottom <= top]
+
+
+###############################################################################
+class IndexedSpriteList(arcade.SpriteList):
+    """ A SpriteList with a SpatialIndex of its sprites. Can be combined
+        with another SpriteList subclass, e.g.
+            class ShipList(IndexedSpriteList, DepthSortedSpriteList) """
+
+    def __init__(self, *args, cell_size=CELL_SIZE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.spatial_index = SpatialIndex(cell_size)
+
+    def append(self, sprite):
+        super().append(sprite)
+        self.spatial_index.move(sprite)
+
+    def insert(self, index, sprite):
+        super().insert(index, sprite)
+        self.spatial_index.move(sprite)
+
+    def remove(self, sprite):
+        super().remove(sprite)
+        self.spatial_index.remove(sprite)
+
+    def update_location(self, sprite):
+        """ Called by the sprite when it moves. """
+        super().update_location(sprite)
+        self.spatial_index.move(sprite)
+
+    def update_size(self, sprite):
+        """ Called by the sprite when its size changes. """
+        super().update_size(sprite)
+        self.spatial_index.move(sprite)
+
+    def update_height(self, sprite):
+        """ Called by the sprite when its height changes. """
+        super().update_height(sprite)
+        self.spatial_index.move(sprite)
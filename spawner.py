@@ -0,0 +1,95 @@
+"""
+Spawner: Spread bursts of new sprites over several frames.
+    "Add 300 meteors every 0.3 seconds" makes one slow frame every 0.3
+    seconds. An Emitter turns it into a rate (1000 meteors a second) and
+    the SpawnScheduler creates what is owed each frame, a few from each
+    emitter in turn, until it runs out of its time budget for the frame.
+    Anything not spawned is carried over to the next frame, so the
+    average rate stays the same.
+    How many were spawned depends on how fast the machine is, so each
+    emitter's count is kept (last_counts) and can be given back to
+    update() to spawn exactly the same again (see replay.py).
+"""
+
+from time import perf_counter
+
+SPAWN_BUDGET_SECONDS = 0.002  # Time per frame that may be spent spawning.
+
+
+###############################################################################
+class Emitter:
+    """ Spawns count sprites every frequency seconds, on average.
+        spawn() creates one sprite (and adds it to its spritelist).
+        If limit and alive() are given, nothing is spawned (or owed)
+        while alive() is at the limit. Both the rate and the limit are
+        multiplied by scale (see population.py). """
+
+    def __init__(self, spawn, count, frequency, limit=None, alive=None):
+        self.spawn = spawn
+        self.count = count
+        self.rate = count / frequency  # Sprites per second.
+        self.limit = limit
+        self.alive = alive
+        self.owed = 0.0  # Sprites due, but not spawned yet.
+        self.scale = 1.0
+
+    def full(self):
+        return (self.limit is not None
+                and self.alive() >= self.limit * self.scale)
+
+    def accrue(self, dt):
+        """ Add dt seconds worth of sprites to what is owed. At most one
+            burst (count) is carried over, so a slow machine doesn't
+            build up an endless backlog. """
+        if self.full():
+            self.owed = 0.0
+        else:
+            self.owed = min(self.owed + self.rate * self.scale * dt,
+                            max(self.count * self.scale, 1))
+
+
+###############################################################################
+class SpawnScheduler:
+    """ Runs a set of emitters under a per frame time budget.
+        A budget of None spawns everything owed every frame. """
+
+    def __init__(self, budget=SPAWN_BUDGET_SECONDS):
+        self.budget = budget
+        self.emitters = []
+        self.time = None
+        self.last_spawned = 0  # Sprites spawned in the last update.
+        self.last_counts = []  # Of those, how many from each emitter.
+
+    def add_emitter(self, emitter):
+        self.emitters.append(emitter)
+        return emitter
+
+    def update(self, time, counts=None):
+        """ Spawn what is owed up to the given (simulation) time.
+            If counts (one per emitter) are given, spawn exactly that
+            many from each, in the same order, ignoring the budget. """
+        if self.time is not None:
+            for emitter in self.emitters:
+                emitter.accrue(time - self.time)
+        self.time = time
+
+        # One from each emitter in turn, so none of them is starved.
+        deadline = perf_counter() + self.budget if self.budget else None
+        spawned = [0] * len(self.emitters)
+        busy = True
+        while busy:
+            busy = False
+            for i, emitter in enumerate(self.emitters):
+                if counts is not None:
+                    due = spawned[i] < counts[i]
+                else:
+                    due = emitter.owed >= 1 and not emitter.full()
+                if due:
+                    emitter.spawn()
+                    emitter.owed -= 1
+                    spawned[i] += 1
+                    busy = True
+            if counts is None and deadline and perf_counter() > deadline:
+                break
+        self.last_spawned = sum(spawned)
+        self.last_counts = spawned
@@ -1,19 +1,39 @@
 """
 Spiral: Maths stuff
+    The spirals only depend on the start angle, which steps through a
+    fixed set of values, so the arcs for each start angle are worked out
+    once into a ShapeElementList (kept in a small LRU cache) and then
+    drawn with a single call per frame. Set CACHED_GEOMETRY = False to
+    draw every arc with draw_arc_outline every frame, as before.
+    F2 swaps to a field of FIELD_SPIRALS random spirals, built in one go
+    by SpiralField (see spiral_field.py) and drawn in one call.
 Usage:
+    F2 - Toggle the spiral field
     ESC - Quit
 """
 
 
 # from random import choice
+from collections import OrderedDict
 from math import sin, cos, pi
 from random import randint
+import numpy as np
 import arcade
 
+from spiral_field import SpiralField
+
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 800
 SCREEN_TITLE = "Spirtal"
 
+CACHED_GEOMETRY = True
+GEOMETRY_CACHE_SIZE = 72  # Start angles kept. 72 holds the whole cycle.
+ARC_SEGMENTS = 128  # Same as draw_arc_outline.
+ARC_BORDER_WIDTH = 5
+SPIRAL_STEPS = 14
+FIELD_SPIRALS = 1000
+FIELD_STEPS = (4, 10)  # Range of steps for the spirals in the field.
+
 
 ###############################################################################
 class Arc:
@@ -39,9 +59,34 @@ class Arc:
         # arcade.draw_arc_filled(self.x, self.y, self.width*2, self.width*2,
         #                        colour, self.start_angle, self.end_angle)
         arcade.draw_arc_outline(self.x, self.y, self.width*2, self.width*2,
-                                colour, self.start_angle, self.end_angle, 5)
+                                colour, self.start_angle, self.end_angle,
+                                ARC_BORDER_WIDTH)
+        self.start_angle += 90
+        self.end_angle += 90
+
+    def points(self, border_width=ARC_BORDER_WIDTH, segments=ARC_SEGMENTS):
+        """ The triangle strip draw_arc_outline would draw. """
+        inside = (self.width*2 - border_width/2) / 2
+        outside = (self.width*2 + border_width/2) / 2
+        start = int(self.start_angle / 360 * segments)
+        end = int(self.end_angle / 360 * segments)
+        points = []
+        for segment in range(start, end + 1):
+            theta = 2 * pi * segment / segments
+            points.append((self.x + inside * cos(theta),
+                           self.y + inside * sin(theta)))
+            points.append((self.x + outside * cos(theta),
+                           self.y + outside * sin(theta)))
+        return points
+
+    def shape(self, colour):
+        """ Like draw(), but returns the arc as a shape to draw later. """
+        points = self.points()
+        shape = arcade.create_triangles_filled_with_colors(
+            points, [colour] * len(points))
         self.start_angle += 90
         self.end_angle += 90
+        return shape
 
 
 class Spiral:
@@ -58,6 +103,32 @@ class Spiral:
             self.arc.draw(self.colour)
             self.arc.update()
 
+    def shapes(self):
+        for _ in range(self.steps):
+            yield self.arc.shape(self.colour)
+            self.arc.update()
+
+
+###############################################################################
+class GeometryCache:
+    """ The spirals for each start angle, built once and kept as one
+        ShapeElementList. The least recently drawn angle is dropped
+        when there are more than size of them. """
+
+    def __init__(self, build, size=GEOMETRY_CACHE_SIZE):
+        self.build = build  # start angle -> ShapeElementList
+        self.size = size
+        self.shape_lists = OrderedDict()
+
+    def get(self, start_angle):
+        try:
+            self.shape_lists.move_to_end(start_angle)
+        except KeyError:
+            self.shape_lists[start_angle] = self.build(start_angle)
+            if len(self.shape_lists) > self.size:
+                self.shape_lists.popitem(last=False)
+        return self.shape_lists[start_angle]
+
 
 ###############################################################################
 class MainWindow(arcade.Window):
@@ -67,19 +138,52 @@ class MainWindow(arcade.Window):
 
     def setup(self):
         self.start_angle = 359
+        self.geometry = GeometryCache(self.build_spirals)
+        self.field = None  # The spiral field shape, while F2 is on.
+
+    def build_field(self, count=FIELD_SPIRALS):
+        field = SpiralField(
+            np.random.uniform(0, (SCREEN_WIDTH, SCREEN_HEIGHT), (count, 2)),
+            np.random.randint(0, 360, count),
+            np.random.randint(1, 3, count),
+            np.random.randint(FIELD_STEPS[0], FIELD_STEPS[1] + 1, count))
+        return field.shape()
+
+    def build_spirals(self, start_angle):
+        """ All the arcs for one start angle, as one ShapeElementList. """
+        shape_list = arcade.ShapeElementList()
+        colour = (randint(100, 255), randint(100, 255), randint(100, 255))
+        for x in (SCREEN_WIDTH/2, SCREEN_WIDTH/2-100):
+            spiral = Spiral(x, SCREEN_HEIGHT/2, 2, start_angle, SPIRAL_STEPS)
+            spiral.colour = colour
+            for shape in spiral.shapes():
+                shape_list.append(shape)
+        spiral = Spiral(SCREEN_WIDTH/2+100, SCREEN_HEIGHT/2, 2, start_angle,
+                        SPIRAL_STEPS)
+        for shape in spiral.shapes():
+            shape_list.append(shape)
+        return shape_list
 
     def on_draw(self):
         self.clear()
+        if self.field:
+            self.field.draw()
+            return
+        if CACHED_GEOMETRY:
+            self.geometry.get(self.start_angle).draw()
+            return
+
         a = Arc(SCREEN_WIDTH/2, SCREEN_HEIGHT/2, 2, self.start_angle)
         x = Arc(SCREEN_WIDTH/2-100, SCREEN_HEIGHT/2, 2, self.start_angle)
         r = randint(100, 255)
         g = randint(100, 255)
         b = randint(100, 255)
 
-        z = Spiral(SCREEN_WIDTH/2+100, SCREEN_HEIGHT/2, 2, self.start_angle, 14)
+        z = Spiral(SCREEN_WIDTH/2+100, SCREEN_HEIGHT/2, 2, self.start_angle,
+                   SPIRAL_STEPS)
         z.draw()
 
-        for _ in range(14):
+        for _ in range(SPIRAL_STEPS):
             a.draw((r, g, b))
             a.update()
             x.draw((r, g, b))
@@ -93,6 +197,8 @@ class MainWindow(arcade.Window):
     def on_key_press(self, key, modifiers):
         if key == arcade.key.ESCAPE:
             arcade.exit()
+        elif key == arcade.key.F2:
+            self.field = None if self.field else self.build_field()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+"""
+SpiralField: Many Fibonacci spirals worked out in one go with NumPy.
+    Spiral.draw() walks Arc.update() one step at a time for one spiral.
+    But each step only adds the previous width to the width (Fibonacci)
+    and moves the centre by the previous width at a right angle, so the
+    centres, radii and angles of every arc of every spiral can be worked
+    out as arrays. The arcs are then tessellated (the same way as
+    draw_arc_outline) into one triangle strip, in one vertex buffer, so
+    the whole field is a single draw call.
+"""
+
+import numpy as np
+import arcade
+from arcade.gl import BufferDescription
+
+ARC_SEGMENTS = 128  # Segments in a full circle. Must be a multiple of 4.
+ARC_BORDER_WIDTH = 5
+
+# The same layout as arcade's buffered shapes: x, y and an RGBA colour.
+VERTEX = np.dtype([("position", "f4", 2), ("colour", "u1", 4)])
+
+
+def fibonacci(count):
+    """ The first count Fibonacci numbers, starting 0, 1, 1, 2, ... """
+    numbers = np.zeros(count, dtype=np.int64)
+    if count > 1:
+        numbers[1] = 1
+    for i in range(2, count):
+        numbers[i] = numbers[i - 1] + numbers[i - 2]
+    return numbers
+
+
+###############################################################################
+class SpiralField:
+    """ A field of spirals, one per entry in the given arrays.
+        origins is an (n, 2) array, the rest are length n. Changing
+        start_angles (or anything else) and calling write() again
+        updates an existing shape, if the number of arcs is the same. """
+
+    def __init__(self, origins, start_angles, widths, steps, colours=None,
+                 border_width=ARC_BORDER_WIDTH, segments=ARC_SEGMENTS):
+        self.origins = np.asarray(origins, dtype=float).reshape(-1, 2)
+        count = len(self.origins)
+        self.start_angles = np.broadcast_to(
+            np.asarray(start_angles, dtype=float), count).copy()
+        self.widths = np.broadcast_to(
+            np.asarray(widths, dtype=float), count).copy()
+        self.steps = np.broadcast_to(np.asarray(steps), count).copy()
+        if colours is None:
+            colours = np.random.randint(100, 256, (count, 3))
+        colours = np.asarray(colours, dtype=np.uint8).reshape(count, -1)
+        if colours.shape[1] == 3:
+            alpha = np.full((count, 1), 255, dtype=np.uint8)
+            colours = np.hstack([colours, alpha])
+        self.colours = colours
+        self.border_width = border_width
+        self.segments = segments
+
+    def __len__(self):
+        return len(self.origins)
+
+    def arcs(self):
+        """ The centres (x, y), radii, start angles and spiral index of
+            every arc, as flat arrays, in drawing order. """
+        count = len(self)
+        max_steps = int(self.steps.max()) if count else 0
+        step = np.arange(max_steps)
+        fib = fibonacci(max_steps + 1)
+        # Arc.update() starts with previous_width 0, so the width goes
+        # w, w, 2w, 3w, 5w, ... and the previous width 0, w, w, 2w, ...
+        widths = self.widths[:, None] * fib[None, 1:]
+        previous = self.widths[:, None] * fib[None, :-1]
+        angles = self.start_angles[:, None] + 90 * step[None, :]
+
+        # After each arc the centre moves by the previous width, at the
+        # end angle plus 90 (after Arc.draw() has added 90 to it), so 270
+        # on from the start angle. Rounded, like Arc.move().
+        heading = (angles + 270) * np.pi / 180
+        move_x = np.round(previous * np.cos(heading))
+        move_y = np.round(previous * np.sin(heading))
+        x = self.origins[:, 0, None] + np.cumsum(move_x, axis=1) - move_x
+        y = self.origins[:, 1, None] + np.cumsum(move_y, axis=1) - move_y
+
+        used = step[None, :] < self.steps[:, None]
+        spiral = np.broadcast_to(np.arange(count)[:, None], used.shape)
+        return x[used], y[used], widths[used], angles[used], spiral[used]
+
+    def vertices(self):
+        """ One triangle strip for the whole field. Each arc is joined
+            to the next by repeating its last and the next one's first
+            vertex, which only makes triangles with no area. """
+        x, y, radius, angle, spiral = self.arcs()
+        quarter = self.segments // 4
+        # For a positive angle int() rounds down, so a 90 degree arc
+        # always covers quarter segments (as in draw_arc_outline).
+        start = (np.mod(angle, 360) / 360 * self.segments).astype(np.int64)
+        segment = start[:, None] + np.arange(quarter + 1)[None, :]
+        theta = 2 * np.pi * segment / self.segments
+        cos, sin = np.cos(theta), np.sin(theta)
+
+        # draw_arc_outline() is given width = radius*2.
+        inside = (radius * 2 - self.border_width / 2) / 2
+        outside = (radius * 2 + self.border_width / 2) / 2
+        points = np.empty((len(x), quarter + 1, 2, 2))
+        points[:, :, 0, 0] = x[:, None] + inside[:, None] * cos
+        points[:, :, 0, 1] = y[:, None] + inside[:, None] * sin
+        points[:, :, 1, 0] = x[:, None] + outside[:, None] * cos
+        points[:, :, 1, 1] = y[:, None] + outside[:, None] * sin
+        points = points.reshape(len(x), -1, 2)
+
+        # Repeat the first and last vertex of each arc, then drop the
+        # repeats at the very start and end of the strip.
+        strip = np.concatenate([points[:, :1], points, points[:, -1:]],
+                               axis=1)
+        per_arc = strip.shape[1]
+        vertices = np.empty((len(x), per_arc), dtype=VERTEX)
+        vertices["position"] = strip
+        vertices["colour"] = self.colours[spiral][:, None, :]
+        return vertices.reshape(-1)[1:-1]
+
+    def shape(self):
+        """ A new arcade Shape holding the whole field. """
+        ctx = arcade.get_window().ctx
+        vbo = ctx.buffer(data=self.vertices().tobytes())
+        shape = arcade.Shape()
+        shape.vbo = vbo
+        shape.vao = ctx.geometry([
+            BufferDescription(vbo, "2f 4f1", ("in_vert", "in_color"),
+                              normalized=["in_color"])])
+        shape.program = ctx.line_generic_with_colors_program
+        shape.mode = ctx.TRIANGLE_STRIP
+        return shape
+
+    def write(self, shape):
+        """ Update the vertices of a shape made by shape(). """
+        shape.vbo.write(self.vertices().tobytes())
@@ -1,10 +1,24 @@
 """
 Sprite1: A quick experiment based on arcade.examples.sprite_move_angle
+    Zoomers are culled once their bounding circle is off screen. (Every
+    zoomer turns every frame, so there is no heading worth caching.)
+    With VECTORIZED_ZOOMERS they are moved together with NumPy (see
+    zoomer_swarm.py).
+    With BATCHED_REMOVAL the sprites killed in an update are removed from
+    their spritelists all at once at the end of it (see removal.py).
+    With ANIMATED_SPINNERS every Spinner's grow/shrink lifetime curve is
+    sampled in one go (see lifetime.py).
+    With COMPACT_SPRITES they keep their own attributes in __slots__, to
+    save memory (see footprint.py).
 """
 
 import math
 from random import random, randint, choice
 import arcade
+from footprint import compact
+from lifetime import LifetimeAnimator
+from removal import BatchedRemovalSpriteList, deferred_removal
+from zoomer_swarm import ZoomerSwarm
 
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
@@ -16,6 +30,11 @@ ANGLE_SPEED = 5
 timer = 0
 TIMER_SIZE = 10
 
+VECTORIZED_ZOOMERS = True
+BATCHED_REMOVAL = True
+ANIMATED_SPINNERS = True
+COMPACT_SPRITES = True
+
 
 class Zoomer(arcade.Sprite):
     """ Zooms across the screen """
@@ -30,21 +49,22 @@ class Zoomer(arcade.Sprite):
         self.speed = speed
         self.angle = angle
         self.change_angle = change_angle
+        # Centre to furthest corner, at any angle. (Scale never changes.)
+        self.radius = math.hypot(self.width, self.height) / 2
 
     def update(self):
-        # Convert angle in degrees to radians.
+        # Move in the direction it was facing, then turn.
         angle_rad = math.radians(self.angle)
-
-        # Rotate the ship
+        x = self.center_x - self.speed * math.sin(angle_rad)
+        y = self.center_y + self.speed * math.cos(angle_rad)
+        self.center_x = x
+        self.center_y = y
         self.angle += self.change_angle
 
-        # Use math to find our change based on our speed and angle
-        self.center_x += -self.speed * math.sin(angle_rad)
-        self.center_y += self.speed * math.cos(angle_rad)
-
-        if self.right < 0 or self.left > SCREEN_WIDTH:
-            self.kill()
-        elif self.top < 0 or self.bottom > SCREEN_HEIGHT:
+        # Kill once its bounding circle is off screen.
+        radius = self.radius
+        if (x + radius < 0 or x - radius > SCREEN_WIDTH
+                or y + radius < 0 or y - radius > SCREEN_HEIGHT):
             self.kill()
 
 
@@ -83,43 +103,77 @@ class Spinner(arcade.Sprite):
             self.kill()
 
 
+# Variants that keep their own attributes in __slots__ (see footprint.py).
+CompactZoomer = compact(Zoomer, "speed", "radius")
+CompactSpinner = compact(Spinner, "scale_delta", "max_scale")
+
+
 class MyGame(arcade.Window):
     def __init__(self, width, height, title):
         super().__init__(width, height, title)
 
-        self.sprite_list = None
+        self.zoomer_list = None
+        self.spinner_list = None
+        self.swarm = None
+        self.spinners = None
         arcade.set_background_color(arcade.color.BLACK)
 
     def setup(self):
-        self.sprite_list = arcade.SpriteList()
+        self.zoomer_list = BatchedRemovalSpriteList()
+        self.spinner_list = BatchedRemovalSpriteList()
+        if VECTORIZED_ZOOMERS:
+            self.swarm = ZoomerSwarm(self.zoomer_list, SCREEN_WIDTH,
+                                     SCREEN_HEIGHT)
+        if ANIMATED_SPINNERS:
+            self.spinners = LifetimeAnimator()
 
     def on_draw(self):
         self.clear()
-        self.sprite_list.draw()
+        self.zoomer_list.draw()
+        self.spinner_list.draw()
 
     def on_update(self, delta_time):
         global timer
-        self.sprite_list.update()
+        removal_lists = ((self.zoomer_list, self.spinner_list)
+                         if BATCHED_REMOVAL else ())
+        with deferred_removal(*removal_lists):
+            if self.swarm is not None:
+                self.swarm.update()
+            else:
+                self.zoomer_list.update()
+            if self.spinners is not None:
+                self.spinners.update()
+            else:
+                self.spinner_list.update()
 
         timer += 1
         if timer >= TIMER_SIZE:
             # Create some new things
             timer = 0
-            self.sprite_list.append(Zoomer(
+            zoomer = (CompactZoomer if COMPACT_SPRITES else Zoomer)(
                 ":resources:images/space_shooter/playerShip1_orange.png",
                 random()+0.2,
                 SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2,
-                random()*4+1, randint(0, 359), random()-0.5))
+                random()*4+1, randint(0, 359), random()-0.5)
+            if self.swarm is not None:
+                self.swarm.append(zoomer)
+            else:
+                self.zoomer_list.append(zoomer)
 
-            self.sprite_list.append(Spinner(
+            spinner = (CompactSpinner if COMPACT_SPRITES else Spinner)(
                 randint(0, SCREEN_WIDTH), randint(0, SCREEN_HEIGHT),
                 random()/8+0.01,
                 random()*2+0.5,
                 randint(1, 10)
-            ))
+            )
+            self.spinner_list.append(spinner)
+            if self.spinners is not None:
+                self.spinners.append(spinner, spinner.max_scale,
+                                     spinner.scale_delta,
+                                     spinner.change_angle)
 
             # For debugging, keep an eye on how many objects we're creating.
-            print(len(self.sprite_list))
+            print(len(self.zoomer_list) + len(self.spinner_list))
 
     def on_key_press(self, key, modifiers):
         if key == arcade.key.ESCAPE:
@@ -2,16 +2,35 @@
 Sprite2: An experiment with sprite scaling, sorting and mouse actions.
 Usage:
     Left mouse button - Click on ship to eject the pilots.
+                        Drag a box to eject the pilots from every ship in it.
     Space - Eject from a random ship.
     Backspace - Eject all the pilots.
     P - Performance Metrics toggle.
-    F1 - Debug info. Show how many sprites are active and FPS.
+    F1 - Debug info. Show how many sprites are active, FPS and the caps.
     ESC - Quit
+Set TRACE_FILE to record a timeline of every frame (see tracer.py).
+The simulation runs at SIMULATION_HZ, whatever the frame rate, and the
+sprites are drawn part way between steps (see fixed_step.py).
+With BATCHED_REMOVAL, sprites killed during a step are removed from their
+spritelists all at once at the end of it (see removal.py).
+With ANIMATED_PILOTS, the ejected pilots follow a lifetime curve worked out
+when they are ejected, all sampled together (see lifetime.py).
+With COMPACT_SPRITES each sprite keeps its own attributes in __slots__, to
+save memory (see footprint.py).
 """
 
-from time import time
-from random import uniform, randint, choice
+from random import uniform, randint, choice, seed
 import arcade
+from contextlib import nullcontext
+from depth_sort import DepthSortedSpriteList
+from fixed_step import FixedTimestep, Interpolator
+from footprint import compact
+from lifetime import LifetimeAnimator
+from population import PopulationController
+from pool import PooledSprite, SpritePool, circle_texture
+from removal import BatchedRemovalSpriteList, deferred_removal
+from spatial_index import IndexedSpriteList
+from tracer import Tracer
 
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
@@ -30,6 +49,28 @@ MAX_SHIPS = 100
 
 EJECTED_PILOTS_TO_ADD = 4
 MAX_EJECTED_PILOTS = 1000
+# Scale the MAX_... caps (and spawn counts) to hold TARGET_FPS. Off, so
+# runs with different settings have the same number of sprites.
+ADAPTIVE_CAPS = False
+TARGET_FPS = 60
+
+# Step the simulation SIMULATION_HZ times a second (at most
+# MAX_CATCH_UP_STEPS a frame), and interpolate when drawing.
+# Off, it is stepped once a frame by however long the frame took.
+FIXED_TIMESTEP = True
+SIMULATION_HZ = 30
+MAX_CATCH_UP_STEPS = 5
+SPEED_FPS = 60  # The delta_... speeds are per frame at this frame rate.
+
+DRAG_PIXELS = 5  # Mouse moved further than this is a drag, not a click.
+
+SPRITE_POOLING = True  # Reuse killed sprites instead of building new ones.
+BATCHED_REMOVAL = True  # Remove killed sprites once per step, not one by one.
+ANIMATED_PILOTS = True  # Sample every pilot's lifetime curve in one go.
+COMPACT_SPRITES = True  # Sprite attributes in __slots__, to save memory.
+
+# Frame phases, sprite totals and inputs, for chrome://tracing or Perfetto.
+TRACE_FILE = None  # e.g. "sprite2_trace.json"
 
 PERFORMANCE_METRICS = False
 GRAPH_WIDTH = int(SCREEN_WIDTH/2)
@@ -37,7 +78,7 @@ GRAPH_HEIGHT = 200
 
 
 ###############################################################################
-class Meteor(arcade.SpriteCircle):
+class Meteor(PooledSprite, arcade.SpriteCircle):
     """ Move a meteor across screen right to left.
         Larger ones are faster, to give a sense of depth. """
 
@@ -45,14 +86,23 @@ class Meteor(arcade.SpriteCircle):
         # Call the parent init (and pick a random image from the list)
         super().__init__(radius=randint(1, 6),
                          color=(100, 100, 100))
+        self.start()
+
+    def reset(self):
+        """ A reused meteor gets a new random size before it starts. """
+        self.texture = circle_texture(randint(1, 6), (100, 100, 100))
+        self.set_hit_box(self.texture.hit_box_points)
+        self.start()
 
+    def start(self):
+        """ Start from just off the right edge of the screen. """
         self.left = SCREEN_WIDTH  # just off right edge of screen
         self.center_y = randint(0, SCREEN_HEIGHT)
         self.delta_x = -self.width  # nearer/bigger = faster
 
-    def update(self):
+    def on_update(self, delta_time=1/SPEED_FPS):
         # Update position.
-        self.center_x += self.delta_x
+        self.center_x += self.delta_x * delta_time * SPEED_FPS
 
         # Kill if off screen.
         if self.right < 0:
@@ -60,7 +110,7 @@ class Meteor(arcade.SpriteCircle):
 
 
 ###############################################################################
-class Ship(arcade.Sprite):
+class Ship(PooledSprite, arcade.Sprite):
     """ Move a random ship across the screen left to right.
         Larger ones are faster, to give a sense of depth. """
 
@@ -76,10 +126,14 @@ class Ship(arcade.Sprite):
     def __init__(self):
         # Call the parent init (and pick a random image from the list)
         file = f":resources:/images/{choice(self.image_list)}"
-        super().__init__(filename=file,
-                         scale=uniform(0.1, 1.0))
+        super().__init__(filename=file)
+        self.reset()
 
+    def reset(self):
+        """ Start (again) from just off the left edge of the screen. """
         Ship.count += 1
+        self.scale = uniform(0.1, 1.0)
+        self.angle = 0  # A reused ship may have been tumbling.
         self.right = -1  # just off left edge of screen
         self.center_y = randint(0, SCREEN_HEIGHT)
         self.angle = -90  # facing right
@@ -88,11 +142,12 @@ class Ship(arcade.Sprite):
         self.delta_x = self.scale*7  # Bigger/nearer the ship, faster it goes
         self.tumbling = False
 
-    def update(self):
+    def on_update(self, delta_time=1/SPEED_FPS):
         # Update position. Apply any rotation/scaling.
-        self.center_x += self.delta_x
-        self.angle += self.delta_angle
-        self.scale += self.delta_scale
+        frames = delta_time * SPEED_FPS
+        self.center_x += self.delta_x * frames
+        self.angle += self.delta_angle * frames
+        self.scale += self.delta_scale * frames
 
         # Kill if off screen or too small to see.
         if self.left > SCREEN_WIDTH or self.scale <= 0:
@@ -107,7 +162,7 @@ class Ship(arcade.Sprite):
 
 
 ###############################################################################
-class EjectedPilot(arcade.Sprite):
+class EjectedPilot(PooledSprite, arcade.Sprite):
     """ A spinning creature that grows then shrinks. """
 
     count = 0  # Keep track of the number of pilots in flight.
@@ -122,8 +177,13 @@ class EjectedPilot(arcade.Sprite):
 
     def __init__(self, x, y, scale, delta_x=0, delta_y=0):
         file = f":resources:/images/{choice(EjectedPilot.image_list)}"
-        super().__init__(filename=file, scale=scale)
+        super().__init__(filename=file)
+        self.reset(x, y, scale, delta_x, delta_y)
+
+    def reset(self, x, y, scale, delta_x=0, delta_y=0):
+        """ Start (again) at x, y. """
         EjectedPilot.count += 1
+        self.scale = scale
         self.center_x = x
         self.center_y = y
         self.delta_x = delta_x
@@ -133,12 +193,13 @@ class EjectedPilot(arcade.Sprite):
         self.delta_scale = (self.max_scale - self.scale) / 50
         self.delta_angle = randint(-5, 5)
 
-    def update(self):
+    def on_update(self, delta_time=1/SPEED_FPS):
         # Rotate the ship
-        self.angle += self.delta_angle
-        self.scale += self.delta_scale
-        self.center_x += self.delta_x
-        self.center_y += self.delta_y
+        frames = delta_time * SPEED_FPS
+        self.angle += self.delta_angle * frames
+        self.scale += self.delta_scale * frames
+        self.center_x += self.delta_x * frames
+        self.center_y += self.delta_y * frames
 
         # Grow then shrink
         if self.scale > self.max_scale:
@@ -148,22 +209,183 @@ class EjectedPilot(arcade.Sprite):
             self.kill()
 
 
+###############################################################################
+class AnimatedPilot(EjectedPilot):
+    """ An EjectedPilot moved, spun, scaled and killed by a
+        LifetimeAnimator instead. """
+
+    def on_update(self, delta_time=1/SPEED_FPS):
+        pass
+
+
+# Variants that keep their own attributes in __slots__ (see footprint.py).
+PILOT_SLOTS = ("delta_x", "delta_y", "delta_angle", "delta_scale",
+               "max_scale", "pool", "lives")
+COMPACT_CLASSES = {
+    Meteor: compact(Meteor, "delta_x", "pool", "lives"),
+    Ship: compact(Ship, "delta_x", "delta_angle", "delta_scale", "tumbling",
+                  "pool", "lives"),
+    EjectedPilot: compact(EjectedPilot, *PILOT_SLOTS),
+    AnimatedPilot: compact(AnimatedPilot, *PILOT_SLOTS),
+}
+
+
+###############################################################################
+class ShipList(IndexedSpriteList, DepthSortedSpriteList,
+               BatchedRemovalSpriteList):
+    """ Ships and EjectedPilots: kept in depth (scale) order, with a
+        spatial index to find the ones under the mouse. Kills can be
+        removed in one batch. """
+
+
+###############################################################################
+class Simulation:
+    """ All the game state and logic, with no window attached.
+        Advance it a fixed amount with step(dt). Time only moves on
+        when step() is called, so a seeded run is always the same. """
+
+    def __init__(self, pooling=SPRITE_POOLING,
+                 batched_removal=BATCHED_REMOVAL,
+                 animated_pilots=ANIMATED_PILOTS,
+                 compact_sprites=COMPACT_SPRITES, random_seed=None):
+        if random_seed is not None:
+            seed(random_seed)
+        Ship.count = 0
+        EjectedPilot.count = 0
+
+        # Pools keep (up to) as many killed sprites as can be alive at once.
+        classes = COMPACT_CLASSES if compact_sprites else {}
+        pilot_class = AnimatedPilot if animated_pilots else EjectedPilot
+        self.meteor_pool = SpritePool(classes.get(Meteor, Meteor),
+                                      MAX_METEORS if pooling else 0)
+        self.ship_pool = SpritePool(classes.get(Ship, Ship),
+                                    MAX_SHIPS if pooling else 0)
+        self.pilot_pool = SpritePool(classes.get(pilot_class, pilot_class),
+                                     MAX_EJECTED_PILOTS if pooling else 0)
+
+        self.population = PopulationController(TARGET_FPS)
+        self.time = 0.0
+        self.meteor_list = BatchedRemovalSpriteList()
+        self.ship_list = ShipList()
+        # Lists whose kills are saved up and removed at the end of update.
+        self.removal_lists = ((self.meteor_list, self.ship_list)
+                              if batched_removal else ())
+        self.pilot_animator = LifetimeAnimator() if animated_pilots else None
+        self.previous_meteor_time = self.time
+        self.previous_ship_time = self.time
+
+    def step(self, dt):
+        """ Advance the simulation by dt seconds. """
+        self.update(dt)
+        self.time += dt
+        self.spawn()
+
+    def update(self, dt=1/SPEED_FPS):
+        """ Update sprite positions. """
+        with deferred_removal(*self.removal_lists):
+            self.meteor_list.on_update(dt)
+            self.ship_list.on_update(dt)
+            if self.pilot_animator is not None:
+                dead = self.pilot_animator.update(dt * SPEED_FPS)
+                EjectedPilot.count -= len(dead)
+
+    def spawn(self):
+        """ Create new meteors and ships at regular intervals. """
+        t = self.time
+        # Produce METEORS_TO_ADD new meteor every METEOR_FREQUENCY_SECONDS
+        # but only if existing number of meteors is within MAX_METEORS.
+        # (Both scaled by the population controller.)
+        cap = self.population.cap
+        if t > self.previous_meteor_time + METEOR_FREQUENCY_SECONDS:
+            self.previous_meteor_time = t
+            if len(self.meteor_list) < cap(MAX_METEORS):
+                for _ in range(cap(METEORS_TO_ADD)):
+                    self.meteor_list.append(self.meteor_pool.get())
+
+        # Produce SHIPS_TO_ADD new ship every SHIP_FREQUENCY_SECONDS
+        # but only if existing number of ships is within MAX_SHIPS.
+        if t > self.previous_ship_time + SHIP_FREQUENCY_SECONDS:
+            self.previous_ship_time = t
+            if Ship.count < cap(MAX_SHIPS):
+                for _ in range(cap(SHIPS_TO_ADD)):
+                    self.ship_list.append(self.ship_pool.get())
+
+    def sprite_counts(self):
+        """ Number of each kind of sprite alive. """
+        return {"meteors": len(self.meteor_list), "ships": Ship.count,
+                "pilots": EjectedPilot.count}
+
+    def depth_sort(self):
+        """ Keep ships (and pilots) list in scale order to give
+            impression of depth. Returns the list to draw.
+            Only sprites that changed scale need to be moved. """
+        self.ship_list.sort_by_depth()
+        return self.ship_list
+
+    def eject_random_pilot(self):
+        """ Eject a pilot from a random ship. """
+        if self.ship_list:
+            self.eject_pilot_from_ship(choice(self.ship_list))
+
+    def eject_all_pilots(self):
+        """ Eject all the pilots! """
+        for ship in self.ship_list:
+            self.eject_pilot_from_ship(ship)
+
+    def eject_pilots_at_point(self, x, y):
+        """ Eject the pilot from the ships at x, y. """
+        ships = self.ship_list.spatial_index.query_point(x, y)
+        for ship in ships:
+            self.eject_pilot_from_ship(ship)
+
+    def eject_pilots_in_rect(self, left, right, bottom, top):
+        """ Eject the pilot from the ships in the rectangle. """
+        ships = self.ship_list.spatial_index.query_rect(left, right,
+                                                        bottom, top)
+        for ship in ships:
+            self.eject_pilot_from_ship(ship)
+
+    def eject_pilot_from_ship(self, ship: Ship):
+        """ Create a pilot at the ships location, and set ship tumbling.
+            Ignore ships that are already tumbling. """
+
+        # Is this object actually a ship (and not a pilot)?
+        if isinstance(ship, Ship) and not ship.tumbling:
+            ship.tumble()
+            if EjectedPilot.count < self.population.cap(MAX_EJECTED_PILOTS):
+                for _ in range(EJECTED_PILOTS_TO_ADD):
+                    pilot = self.pilot_pool.get(ship.center_x, ship.center_y,
+                                                ship.scale, ship.delta_x/2,
+                                                randint(-5, 5))
+                    self.ship_list.append(pilot)
+                    if self.pilot_animator is not None:
+                        self.pilot_animator.append(
+                            pilot, pilot.max_scale, pilot.delta_scale,
+                            pilot.delta_angle, pilot.delta_x, pilot.delta_y)
+
+
 ###############################################################################
 class MyGame(arcade.Window):
+    """ Draw the simulation and pass keyboard and mouse input to it. """
+
     def __init__(self, width, height, title, vsync=False):
         super().__init__(width, height, title, vsync)
         arcade.set_background_color(arcade.color.BLACK)
         arcade.enable_timings()  # required for performance metrics.
 
-        self.meteor_list = None
-        self.ship_list = None  # Can also contain EjectedPilots
+        self.simulation = None
         self.perf_graph_list = None
+        self.mouse_press_position = None
+        self.tracer = None
+        self.timestep = None
+        self.interpolator = None
 
     def setup(self):
-        self.meteor_list = arcade.SpriteList()
-        self.ship_list = arcade.SpriteList()
-        self.previous_meteor_time = time()
-        self.previous_ship_time = time()
+        self.simulation = Simulation()
+        self.tracer = Tracer(TRACE_FILE, SCREEN_TITLE)
+        self.timestep = FixedTimestep(SIMULATION_HZ, MAX_CATCH_UP_STEPS)
+        self.interpolator = Interpolator(self.simulation.meteor_list,
+                                         self.simulation.ship_list)
 
         # Create a sprite list and put the FPS performance graph into it
         self.perf_graph_list = arcade.SpriteList()
@@ -177,40 +399,73 @@ class MyGame(arcade.Window):
             Sort ships (and pilots) list into scale order to give
             impression of depth. """
 
-        if not TRIPPY_MODE:
-            self.clear()
-
-        self.meteor_list.draw()
-        self.ship_list.sort(key=lambda s: s.scale)
-        self.ship_list.draw()
-
-        if PERFORMANCE_METRICS:
-            self.perf_graph_list.draw()
+        tracer = self.tracer
+        population = self.simulation.population
+        with population.timed():
+            if FIXED_TIMESTEP:
+                # Sorted after stepping, and drawn between the last two steps.
+                ship_list = self.simulation.ship_list
+                alpha = self.timestep.alpha
+                interpolated = self.interpolator.interpolated(alpha)
+            else:
+                with tracer.slice("sort"):
+                    ship_list = self.simulation.depth_sort()
+                interpolated = nullcontext()
+
+            with tracer.slice("draw"), interpolated:
+                if not TRIPPY_MODE:
+                    self.clear()
+
+                self.simulation.meteor_list.draw()
+                ship_list.draw()
+
+                if PERFORMANCE_METRICS:
+                    self.perf_graph_list.draw()
+        if ADAPTIVE_CAPS:
+            population.end_frame()
+
+        if tracer.enabled:
+            tracer.counter("sprites", **self.simulation.sprite_counts())
 
     def on_update(self, delta_time):
-        """ Update sprite positions.
-            Create new meteors and ships at regular intervals.
-            Check for keyboard and mouse input. """
-
-        self.meteor_list.update()
-        self.ship_list.update()
-
-        t = time()
-        # Produce METEORS_TO_ADD new meteor every METEOR_FREQUENCY_SECONDS
-        # but only if existing number of meteors is within MAX_METEORS.
-        if t > self.previous_meteor_time + METEOR_FREQUENCY_SECONDS:
-            self.previous_meteor_time = t
-            if len(self.meteor_list) < MAX_METEORS:
-                for _ in range(METEORS_TO_ADD):
-                    self.meteor_list.append(Meteor())
-
-        # Produce SHIPS_TO_ADD new ship every SHIP_FREQUENCY_SECONDS
-        # but only if existing number of ships is within MAX_SHIPS.
-        if t > self.previous_ship_time + SHIP_FREQUENCY_SECONDS:
-            self.previous_ship_time = t
-            if Ship.count < MAX_SHIPS:
-                for _ in range(SHIPS_TO_ADD):
-                    self.ship_list.append(Ship())
+        with self.simulation.population.timed():
+            self.advance(delta_time)
+
+    def advance(self, delta_time):
+        """ Step the simulation for a frame that took delta_time. """
+        simulation = self.simulation
+        tracer = self.tracer
+        if not FIXED_TIMESTEP:
+            self.step(delta_time)
+            return
+
+        steps = self.timestep.advance(delta_time)
+        for step in range(steps):
+            if step == steps - 1:
+                self.interpolator.before_step()
+            self.step(self.timestep.dt)
+        if steps:
+            # Scales only change in a step, so sort once after them.
+            with tracer.slice("sort"):
+                simulation.depth_sort()
+            self.interpolator.after_step()
+
+    def step(self, dt):
+        """ Advance the simulation by dt seconds. """
+        simulation = self.simulation
+        with self.tracer.slice("update"):
+            simulation.update(dt)
+        with self.tracer.slice("spawn"):
+            simulation.time += dt
+            simulation.spawn()
+
+    def eject(self, method, *args):
+        """ Call one of the simulation's eject methods (by name), and
+            mark it on the trace with the number of pilots ejected. """
+        pilots = EjectedPilot.count
+        with self.tracer.slice("input"):
+            getattr(self.simulation, method)(*args)
+        self.tracer.instant(method, pilots=EjectedPilot.count - pilots)
 
     def on_key_press(self, key, modifiers):
         if key == arcade.key.ESCAPE:
@@ -219,56 +474,61 @@ class MyGame(arcade.Window):
 
         elif key == arcade.key.F1:
             # Show number of active sprites.
-            print(f"Meteors {len(self.meteor_list):4} "
+            print(f"Meteors {len(self.simulation.meteor_list):4} "
                   f" | Ships {Ship.count:4} "
                   f" | Pilots {EjectedPilot.count:4} "
                   f" | FPS {arcade.get_fps(60):3.1f}")
+            print(self.simulation.population.stats(
+                meteors=MAX_METEORS, ships=MAX_SHIPS,
+                pilots=MAX_EJECTED_PILOTS))
+            for pool in (self.simulation.meteor_pool,
+                         self.simulation.ship_pool,
+                         self.simulation.pilot_pool):
+                print(pool.stats())
 
         elif key == arcade.key.SPACE:
             # Eject a pilot from a random ship.
-            ship = choice(self.ship_list)
-            self.eject_pilot_from_ship(ship)
+            self.eject("eject_random_pilot")
 
         elif key == arcade.key.BACKSPACE:
             # Eject all the pilots!
-            for ship in self.ship_list:
-                self.eject_pilot_from_ship(ship)
+            self.eject("eject_all_pilots")
 
         elif key == arcade.key.P:
             # Toggle Performance Metrics
             global PERFORMANCE_METRICS
             PERFORMANCE_METRICS = not PERFORMANCE_METRICS
+            self.tracer.instant("performance_metrics",
+                                on=PERFORMANCE_METRICS)
 
         elif key == arcade.key.T:
             # Toggle Trippy Mode
             global TRIPPY_MODE
             TRIPPY_MODE = not TRIPPY_MODE
+            self.tracer.instant("trippy_mode", on=TRIPPY_MODE)
 
     def on_mouse_press(self, x, y, button, key_modifiers):
         """ Eject the pilot from the ships being clicked on. """
-        ships = arcade.get_sprites_at_point((x, y), self.ship_list)
-        for ship in ships:
-            self.eject_pilot_from_ship(ship)
-
-    def eject_pilot_from_ship(self, ship: Ship):
-        """ Create a pilot at the ships location, and set ship tumbling.
-            Ignore ships that are already tumbling. """
+        self.mouse_press_position = x, y
+        self.eject("eject_pilots_at_point", x, y)
 
-        # Is this object actually a ship (and not a pilot)?
-        if type(ship) == Ship and not ship.tumbling:
-            ship.tumble()
-            if EjectedPilot.count < MAX_EJECTED_PILOTS:
-                for _ in range(EJECTED_PILOTS_TO_ADD):
-                    self.ship_list.append(
-                        EjectedPilot(ship.center_x, ship.center_y,
-                                     ship.scale,
-                                     ship.delta_x/2, randint(-5, 5)))
+    def on_mouse_release(self, x, y, button, key_modifiers):
+        """ If the mouse was dragged, eject the pilots from all the
+            ships in the box. """
+        if self.mouse_press_position is None:
+            return
+        start_x, start_y = self.mouse_press_position
+        self.mouse_press_position = None
+        if abs(x - start_x) > DRAG_PIXELS or abs(y - start_y) > DRAG_PIXELS:
+            self.eject("eject_pilots_in_rect", min(x, start_x),
+                       max(x, start_x), min(y, start_y), max(y, start_y))
 
 
 def main():
     window = MyGame(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE, VSYNC)
     window.setup()
     arcade.run()
+    window.tracer.save()
 
 
 if __name__ == "__main__":
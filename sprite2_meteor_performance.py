@@ -6,14 +6,39 @@ Usage:
     Left mouse button - Click on ship to eject the pilot.
     Space - Eject a random pilot.
     Backspace - Eject all the pilots.
-    P - Display/hide performance metrics.
-    F1 - Debug info. Show how many sprites are active.
+    P - Display/hide the frame time HUD (percentiles and hitches).
+    F1 - Debug info. Show how many sprites are active, the caps and
+         where the last frame's time went.
     F2 - Switch between meteor types.
 
     ESC - Quit
 
 TLDR: Rotating thousands of sprites every frame is computationally expensive!
       Circle Sprites or Sprites based on images doesn't make much difference.
+      VECTORIZED_METEORS moves the whole meteor field with NumPy instead of
+      calling update() on every meteor (see meteor_field.py).
+      AMORTIZED_SPAWNING spreads each burst of new meteors over several
+      frames (see spawner.py), which smooths out the p99 frame time.
+      QuantizedRotatingMeteor snaps to ROTATION_BUCKETS pre-rotated textures
+      (see rotation_cache.py), which roughly halves the cost of a per sprite
+      update. With VECTORIZED_METEORS, rotating on the GPU is cheaper still.
+      Reproduce the numbers with: python benchmark.py
+      METRICS times each phase of every frame (see metrics.py), and
+      METRICS_FILE writes them out as JSON lines.
+      The frame time HUD (see frame_hud.py) shows p50/p95/p99/max and
+      tags each hitch with what was spawned, ejected, killed and sorted.
+      MULTIPROCESS_METEORS moves the meteors in a worker process, over
+      shared memory (see shared_field.py).
+      PARALLEL_WORKERS updates chunks of the sprites on a thread pool
+      (see parallel_update.py).
+      BATCHED_REMOVAL removes the sprites killed in an update all at once
+      at the end of it (see removal.py), instead of one at a time.
+      ANIMATED_PILOTS samples every ejected pilot's lifetime curve in one
+      NumPy pass (see lifetime.py), instead of stepping each pilot.
+      COMPACT_SPRITES keeps each sprite's own attributes in __slots__,
+      about a third of the memory per sprite (python footprint.py).
+      RECORD_FILE records the seed, inputs and spawns of a run, to replay
+      exactly (REPLAY_FILE, or headless with replay.py) after a change.
 
 Bonus: Trippy mode looks pretty cool with thousands of meteors :)
 
@@ -21,9 +46,22 @@ TODO:
     - Put Pilots and Ships back in one list?
 """
 
-from time import time
-from random import uniform, randint, choice
+from random import uniform, randint, choice, seed, getrandbits
 import arcade
+from depth_sort import DepthSortedSpriteList, MergedDepthView
+from footprint import compact
+from frame_hud import FrameTimeHUD
+from lifetime import LifetimeAnimator
+from meteor_field import MeteorField
+from parallel_update import ParallelUpdater
+from metrics import FrameMetrics
+from population import PopulationController
+from pool import PooledSprite, SpritePool, circle_texture
+from removal import BatchedRemovalSpriteList, deferred_removal
+from replay import Recorder, Replayer
+from shared_field import SharedMeteorField
+from rotation_cache import RotationCache
+from spawner import Emitter, SpawnScheduler
 
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
@@ -34,15 +72,37 @@ SHIP_FREQUENCY_SECONDS = 0.15
 METEOR_FREQUENCY_SECONDS = 0.3
 MAX_METEORS = 2000
 METEORS_TO_ADD = 300
-
-# Size of performance graphs and distance between them
+VECTORIZED_METEORS = True
+SPRITE_POOLING = True  # Reuse killed meteors instead of building new ones.
+AMORTIZED_SPAWNING = True  # Spread meteor bursts over several frames.
+MULTIPROCESS_METEORS = False  # Move the meteors in another process.
+PARALLEL_WORKERS = 0  # Threads updating chunks of sprites. 0 for none.
+BATCHED_REMOVAL = True  # Remove killed sprites once per update.
+ANIMATED_PILOTS = True  # Sample every pilot's lifetime curve in one go.
+COMPACT_SPRITES = True  # Sprite attributes in __slots__, to save memory.
+ROTATION_BUCKETS = 32  # Angles a QuantizedRotatingMeteor can show.
+
+# Scale MAX_METEORS (and spawn rates) to hold TARGET_FPS. Off, so every
+# meteor type is compared with the same number of meteors.
+ADAPTIVE_CAPS = False
+TARGET_FPS = 60
+
+# Per phase frame timings and sprites created/killed (see metrics.py).
+METRICS = True
+METRICS_FILE = None  # e.g. "metrics.jsonl"
+
+# Record a run (seed, inputs and spawns) or play one back (see replay.py).
+# Both step the simulation by FIXED_DT per frame, so they match exactly.
+RECORD_FILE = None  # e.g. "recording.jsonl"
+REPLAY_FILE = None
+FIXED_DT = 1/60
+
+# Frame time percentiles and hitches (see frame_hud.py).
 PERFORMANCE_METRICS = True
-GRAPH_WIDTH = int(SCREEN_WIDTH/2)
-GRAPH_HEIGHT = 200
 
 
 ###############################################################################
-class CircleMeteor(arcade.SpriteCircle):
+class CircleMeteor(PooledSprite, arcade.SpriteCircle):
     """ Move a meteor across screen right to left.
         Larger ones are faster, to give a sense of depth. """
 
@@ -50,23 +110,34 @@ class CircleMeteor(arcade.SpriteCircle):
         # Call the parent init (and pick a random image from the list)
         super().__init__(radius=randint(1, 8),
                          color=(155, 155, 155))
+        self.start()
+
+    def reset(self):
+        """ A reused meteor gets a new random size before it starts. """
+        self.texture = circle_texture(randint(1, 8), (155, 155, 155))
+        self.set_hit_box(self.texture.hit_box_points)
+        self.start()
 
+    def start(self):
+        """ Start from just off the right edge of the screen. """
         self.left = SCREEN_WIDTH  # just off right edge of screen
         self.center_y = randint(0, SCREEN_HEIGHT)
 
         self.delta_x = -self.width  # nearer/bigger = faster
 
     def update(self):
-        # Update position.
-        self.center_x += self.delta_x
-
         # Kill if off screen.
-        if self.right < 0:
+        if not self.advance():
             self.kill()
 
+    def advance(self):
+        """ Update position. Returns False once off screen. """
+        self.center_x += self.delta_x
+        return self.right >= 0
+
 
 ###############################################################################
-class NoRotationMeteor(arcade.Sprite):
+class NoRotationMeteor(PooledSprite, arcade.Sprite):
     """ Move a meteor across screen right to left.
         Larger ones are faster, to give a sense of depth. """
 
@@ -79,24 +150,29 @@ class NoRotationMeteor(arcade.Sprite):
 
     def __init__(self):
         # Call the parent init (and pick a random image from the list)
-        super().__init__(filename=choice(self.image_list),
-                         scale=uniform(0.1, 0.5))
+        super().__init__(filename=choice(self.image_list))
+        self.reset()
 
+    def reset(self):
+        """ Start (again) from just off the right edge of the screen. """
+        self.scale = uniform(0.1, 0.5)
         self.left = SCREEN_WIDTH  # just off right edge of screen
         self.center_y = randint(0, SCREEN_HEIGHT)
         self.delta_x = -self.scale*20  # nearer/bigger = faster
 
     def update(self):
-        # Update position. Apply any rotation.
-        self.center_x += self.delta_x
-
         # Kill if off screen.
-        if self.right < 0:
+        if not self.advance():
             self.kill()
 
+    def advance(self):
+        """ Update position. Returns False once off screen. """
+        self.center_x += self.delta_x
+        return self.right >= 0
+
 
 ###############################################################################
-class RotatingMeteor(arcade.Sprite):
+class RotatingMeteor(PooledSprite, arcade.Sprite):
     """ Move a meteor across screen right to left.
         Larger ones are faster, to give a sense of depth. """
 
@@ -109,23 +185,57 @@ class RotatingMeteor(arcade.Sprite):
 
     def __init__(self):
         # Call the parent init (and pick a random image from the list)
-        super().__init__(filename=choice(self.image_list),
-                         scale=uniform(0.1, 0.5))
+        super().__init__(filename=choice(self.image_list))
+        self.reset()
 
+    def reset(self):
+        """ Start (again) from just off the right edge of the screen. """
+        self.scale = uniform(0.1, 0.5)
+        self.angle = 0
         self.left = SCREEN_WIDTH  # just off right edge of screen
         self.center_y = randint(0, SCREEN_HEIGHT)
-        self.angle = 0
         self.delta_angle = randint(-5, 5)
         self.delta_x = -self.scale*20  # nearer/bigger = faster
 
     def update(self):
-        # Update position. Apply any rotation.
+        # Kill if off screen.
+        if not self.advance():
+            self.kill()
+
+    def advance(self):
+        """ Update position. Apply any rotation.
+            Returns False once off screen. """
         self.center_x += self.delta_x
         self.angle += self.delta_angle
+        return self.right >= 0
 
-        # Kill if off screen.
-        if self.right < 0:
-            self.kill()
+
+###############################################################################
+class QuantizedRotatingMeteor(RotatingMeteor):
+    """ A RotatingMeteor that snaps its angle to one of ROTATION_BUCKETS.
+        Each angle is a pre-rotated texture (and hit box) from the cache,
+        so the sprite itself is never rotated. """
+
+    rotation_cache = RotationCache(ROTATION_BUCKETS)
+
+    def __init__(self):
+        self.rotation = 0
+        self.rotations = None  # This meteor's texture, rotated per bucket.
+        super().__init__()
+
+    @property
+    def angle(self):
+        return self.rotation
+
+    @angle.setter
+    def angle(self, value):
+        self.rotation = value
+        if self.rotations is None:
+            self.rotations = self.rotation_cache.textures(self.texture)
+        texture = self.rotations[self.rotation_cache.bucket(value)]
+        if texture is not self.texture:
+            self.texture = texture
+            self.set_hit_box(texture.hit_box_points)
 
 
 ###############################################################################
@@ -155,14 +265,17 @@ class Ship(arcade.Sprite):
         self.tumbling = False
 
     def update(self):
-        # Update position. Apply any rotation/scaling.
+        # Kill if off screen or too small to see.
+        if not self.advance():
+            self.kill()
+
+    def advance(self):
+        """ Update position. Apply any rotation/scaling.
+            Returns False once off screen or too small to see. """
         self.center_x += self.delta_x
         self.angle += self.delta_angle
         self.scale += self.delta_scale
-
-        # Kill if off screen or too small to see.
-        if self.left > SCREEN_WIDTH or self.scale <= 0:
-            self.kill()
+        return self.left <= SCREEN_WIDTH and self.scale > 0
 
     def tumble(self):
         """ Set the ship to tumble and 'fall' """
@@ -196,7 +309,11 @@ class EjectedPilot(arcade.Sprite):
         self.delta_angle = randint(-5, 5)
 
     def update(self):
-        # Rotate the ship
+        if not self.advance():
+            self.kill()
+
+    def advance(self):
+        """ Rotate, grow then shrink. Returns False once shrunk away. """
         self.angle += self.delta_angle
         self.scale += self.delta_scale
         self.center_x += self.delta_x
@@ -204,104 +321,360 @@ class EjectedPilot(arcade.Sprite):
         # Grow then shrink
         if self.scale > self.max_scale:
             self.delta_scale *= -1
-        elif self.scale <= 0:
-            self.kill()
+        return self.scale > 0
+
+
+# Variants that keep their own attributes in __slots__ (see footprint.py).
+COMPACT_CLASSES = {
+    CircleMeteor: compact(CircleMeteor, "delta_x", "pool", "lives"),
+    NoRotationMeteor: compact(NoRotationMeteor, "delta_x", "pool", "lives"),
+    RotatingMeteor: compact(RotatingMeteor, "delta_x", "delta_angle",
+                            "pool", "lives"),
+    QuantizedRotatingMeteor: compact(QuantizedRotatingMeteor, "delta_x",
+                                     "delta_angle", "rotation", "rotations",
+                                     "pool", "lives"),
+    Ship: compact(Ship, "delta_x", "delta_angle", "delta_scale",
+                  "tumbling"),
+    EjectedPilot: compact(EjectedPilot, "delta_x", "delta_angle",
+                          "delta_scale", "max_scale"),
+}
+
+
+###############################################################################
+class DepthSortedList(DepthSortedSpriteList, BatchedRemovalSpriteList):
+    """ Ships or pilots, kept in scale order. Kills can be removed in
+        one batch. """
+
+
+###############################################################################
+class Simulation:
+    """ All the game state and logic, with no window attached.
+        Advance it a fixed amount with step(dt). Time only moves on
+        when step() is called, so a seeded run is always the same. """
+
+    meteor_types = [RotatingMeteor, NoRotationMeteor, CircleMeteor,
+                    QuantizedRotatingMeteor]
+
+    def __init__(self, meteor_type=0, vectorized=VECTORIZED_METEORS,
+                 pooling=SPRITE_POOLING, amortized=AMORTIZED_SPAWNING,
+                 multiprocess=MULTIPROCESS_METEORS,
+                 parallel=PARALLEL_WORKERS,
+                 batched_removal=BATCHED_REMOVAL,
+                 animated_pilots=ANIMATED_PILOTS,
+                 max_meteors=MAX_METEORS, meteors_to_add=METEORS_TO_ADD,
+                 compact_sprites=COMPACT_SPRITES, random_seed=None):
+        # Every setting, so a recording can be replayed with the same.
+        self.settings = dict(
+            meteor_type=meteor_type, vectorized=vectorized, pooling=pooling,
+            amortized=amortized, multiprocess=multiprocess,
+            parallel=parallel, batched_removal=batched_removal,
+            animated_pilots=animated_pilots, max_meteors=max_meteors,
+            meteors_to_add=meteors_to_add, compact_sprites=compact_sprites)
+        if random_seed is not None:
+            seed(random_seed)
+        self.max_meteors = max_meteors
+        self.meteors_to_add = meteors_to_add
+        classes = COMPACT_CLASSES if compact_sprites else {}
+        self.meteor_pools = [SpritePool(classes.get(meteor_class,
+                                                    meteor_class),
+                                        max_meteors if pooling else 0)
+                             for meteor_class in self.meteor_types]
+        self.ship_class = classes.get(Ship, Ship)
+        self.pilot_class = classes.get(EjectedPilot, EjectedPilot)
+
+        self.population = PopulationController(TARGET_FPS)
+        self.time = 0.0
+        self.meteor_type = meteor_type
+        self.vectorized = vectorized or multiprocess
+        self.meteor_list = BatchedRemovalSpriteList()
+        # Updates sprites (and the MeteorField) in chunks on parallel
+        # threads. The kills are saved up until they have all finished.
+        self.updater = ParallelUpdater(parallel)
+        if multiprocess:
+            self.meteor_field = SharedMeteorField(self.meteor_list)
+        else:
+            self.meteor_field = MeteorField(self.meteor_list, self.updater)
+        # Ships and pilots are each kept in scale order, and drawn merged.
+        self.ship_list = DepthSortedList()
+        self.pilot_list = DepthSortedList()
+        self.ships_and_pilots = MergedDepthView(self.ship_list,
+                                                self.pilot_list)
+        # Lists whose kills are saved up and removed at the end of update.
+        self.removal_lists = ((self.meteor_list, self.ship_list,
+                               self.pilot_list) if batched_removal else ())
+        self.pilot_animator = LifetimeAnimator() if animated_pilots else None
+        self.previous_meteor_time = self.time
+        self.previous_ship_time = self.time
+
+        # What has happened since take_events() was last called.
+        self.spawned = 0
+        self.ejected = 0
+        self.killed = 0
+
+        # Spread meteor bursts (and ships) out over several frames.
+        self.spawner = None
+        if amortized:
+            self.spawner = SpawnScheduler()
+            self.spawner.add_emitter(Emitter(
+                self.add_meteor, meteors_to_add, METEOR_FREQUENCY_SECONDS,
+                limit=max_meteors, alive=lambda: len(self.meteor_list)))
+            self.spawner.add_emitter(Emitter(
+                self.add_ship, 1, SHIP_FREQUENCY_SECONDS))
+
+    def close(self):
+        """ Stop the meteor worker process and update threads, if there
+            are any. """
+        self.meteor_field.close()
+        self.updater.close()
+
+    def next_meteor_type(self):
+        """ Switch to the next type of meteor. """
+        self.meteor_type += 1
+        if self.meteor_type >= len(self.meteor_types):
+            self.meteor_type = 0
+
+    def step(self, dt):
+        """ Advance the simulation by dt seconds. """
+        self.update()
+        self.time += dt
+        self.spawn()
+
+    def update(self):
+        """ Update sprite positions. """
+        alive = sum(self.sprite_counts().values())
+        with deferred_removal(*self.removal_lists):
+            if self.vectorized:
+                self.meteor_field.update()
+            else:
+                self.updater.update_sprites(self.meteor_list)
+            self.updater.update_sprites(self.ship_list)
+            if self.pilot_animator is not None:
+                self.pilot_animator.update()
+            else:
+                self.updater.update_sprites(self.pilot_list)
+        self.killed += alive - sum(self.sprite_counts().values())
+
+    def spawn(self, counts=None):
+        """ Create new meteors and ships at regular intervals.
+            counts are how many each emitter should spawn, when
+            replaying an amortized run. """
+        if self.spawner:
+            for emitter in self.spawner.emitters:
+                emitter.scale = self.population.scale
+            self.spawner.update(self.time, counts)
+            return
+
+        t = self.time
+        cap = self.population.cap
+        # Produce meteors_to_add new meteor every METEOR_FREQUENCY_SECONDS
+        # if existing number of meteors is within max_meteors.
+        # (Both scaled by the population controller.)
+        if t > self.previous_meteor_time + METEOR_FREQUENCY_SECONDS:
+            self.previous_meteor_time = t
+            if len(self.meteor_list) < cap(self.max_meteors):
+                for _ in range(cap(self.meteors_to_add)):
+                    self.add_meteor()
+
+        # Produce a new ship every SHIP_FREQUENCY_SECONDS
+        if t > self.previous_ship_time + SHIP_FREQUENCY_SECONDS:
+            self.previous_ship_time = t
+            self.add_ship()
+
+    def add_meteor(self):
+        """ The type of meteor added is based on the current meteor_type. """
+        meteor = self.meteor_pools[self.meteor_type].get()
+        self.spawned += 1
+        if self.vectorized:
+            self.meteor_field.append(meteor)
+        else:
+            self.meteor_list.append(meteor)
+
+    def add_ship(self):
+        self.ship_list.append(self.ship_class())
+        self.spawned += 1
+
+    def sprite_counts(self):
+        """ Number of each kind of sprite alive. """
+        return {"meteors": len(self.meteor_list),
+                "ships": len(self.ship_list),
+                "pilots": len(self.pilot_list)}
+
+    def depth_sort(self):
+        """ Sort ships and pilots by scale, then merge them (without
+            copying) into one draw order. This forces bigger/nearer ones
+            to be drawn over far away ones. Returns what to draw. """
+        self.ship_list.sort_by_depth()
+        self.pilot_list.sort_by_depth()
+        return self.ships_and_pilots.merge()
+
+    def eject_random_pilot(self):
+        """ Eject a pilot from a random ship. """
+        if self.ship_list:
+            self.eject_pilot_from_ship(choice(self.ship_list))
+
+    def eject_all_pilots(self):
+        """ Eject all the pilots! """
+        for ship in self.ship_list:
+            self.eject_pilot_from_ship(ship)
+
+    def eject_pilots_at_point(self, x, y):
+        """ Eject the pilot from the ships at x, y. """
+        ships = arcade.get_sprites_at_point((x, y), self.ship_list)
+        for ship in ships:
+            self.eject_pilot_from_ship(ship)
+
+    def eject_pilot_from_ship(self, ship: Ship):
+        """ Create a pilot at the ships location, and set ship tumbling.
+            (Ignore ships that are already tumbling) """
+        if not ship.tumbling:
+            ship.tumble()
+            new_pilot = self.pilot_class(ship.center_x, ship.center_y,
+                                         ship.scale, ship.delta_x/2)
+            self.pilot_list.append(new_pilot)
+            if self.pilot_animator is not None:
+                self.pilot_animator.append(new_pilot, new_pilot.max_scale,
+                                           new_pilot.delta_scale,
+                                           new_pilot.delta_angle,
+                                           new_pilot.delta_x)
+            self.ejected += 1
+
+    def take_events(self):
+        """ Sprites spawned, pilots ejected, sprites killed and sprites
+            moved by the depth sort since the last call. """
+        events = {"spawned": self.spawned, "ejected": self.ejected,
+                  "killed": self.killed,
+                  "sorted": (self.ship_list.last_sort_size
+                             + self.pilot_list.last_sort_size)}
+        self.spawned = self.ejected = self.killed = 0
+        return events
 
 
 ###############################################################################
 class MyGame(arcade.Window):
+    """ Draw the simulation and pass keyboard and mouse input to it. """
+
     def __init__(self, width, height, title, vsync=False):
         super().__init__(width, height, title, vsync)
         arcade.set_background_color(arcade.color.BLACK)
 
-        self.meteor_list = None
-        self.ship_list = None
-        self.pilot_list = None
-        self.perf_graph_list = None
-        self.meteor_types = [RotatingMeteor, NoRotationMeteor, CircleMeteor]
-        self.meteor_type = 0
-        print(self.meteor_types[self.meteor_type])
+        self.simulation = None
+        self.hud = None
+        self.metrics = None
+        self.recorder = None
+        self.replayer = None
 
     def setup(self):
-        self.meteor_list = arcade.SpriteList()
-        self.ship_list = arcade.SpriteList()
-        self.pilot_list = arcade.SpriteList()
-        self.previous_meteor_time = time()
-        self.previous_ship_time = time()
-
-        # Create a sprite list and put the FPS performance graph into it
-        self.perf_graph_list = arcade.SpriteList()
-        graph = arcade.PerfGraph(GRAPH_WIDTH, GRAPH_HEIGHT, graph_data="FPS")
-        graph.center_x = SCREEN_WIDTH / 2
-        graph.top = SCREEN_HEIGHT - 10
-        self.perf_graph_list.append(graph)
+        if REPLAY_FILE:
+            self.replayer = Replayer(REPLAY_FILE)
+            self.simulation = self.replayer.simulation(Simulation)
+        elif RECORD_FILE:
+            random_seed = getrandbits(32)
+            self.simulation = Simulation(random_seed=random_seed)
+            self.recorder = Recorder(RECORD_FILE, random_seed, FIXED_DT,
+                                     **self.simulation.settings)
+        else:
+            self.simulation = Simulation()
+        self.metrics = FrameMetrics(METRICS, METRICS_FILE)
+        print(self.simulation.meteor_types[self.simulation.meteor_type])
+        self.hud = FrameTimeHUD(10, SCREEN_HEIGHT - 10)
 
     def on_draw(self):
         """ Draw meteor field first.
-            Then merge ships and pilots into one list, then sort by scale.
-            This forces bigger/nearer ones to be drawn over far away ones.
-            There's probably a better way to do this! """
-
-        if not TRIPPY_MODE:
-            self.clear()
-        self.meteor_list.draw()
-
-        all_sprites = arcade.SpriteList()
-        all_sprites.extend(self.ship_list)
-        all_sprites.extend(self.pilot_list)
-        all_sprites.sort(key=lambda s: s.scale)
-        all_sprites.draw()
-
-        # Draw the performance graph(s)
-        if PERFORMANCE_METRICS:
-            self.perf_graph_list.draw()
+            Then ships and pilots, sorted by scale to give depth. """
+
+        metrics = self.metrics
+        population = self.simulation.population
+        with population.timed(), metrics.timer("sort"):
+            ships_and_pilots = self.simulation.depth_sort()
+
+        # Draw calls are queued, so this is the CPU side of drawing.
+        with population.timed(), metrics.timer("draw"):
+            if not TRIPPY_MODE:
+                self.clear()
+            self.simulation.meteor_list.draw()
+            ships_and_pilots.draw()
+
+            # Draw the frame time percentiles and hitches
+            if PERFORMANCE_METRICS:
+                self.hud.draw()
+        metrics.end_frame()
+        if ADAPTIVE_CAPS and not self.replaying():
+            population.end_frame()
+        self.hud.end_frame(**self.simulation.take_events())
 
     def on_update(self, delta_time):
-        """ Update sprite positions.
-            Create new meteors and ships at regular intervals.
-            Check for keyboard and mouse input. """
-
-        self.meteor_list.update()
-        self.ship_list.update()
-        self.pilot_list.update()
-
-        t = time()
-        # Produce METEORS_TO_ADD new meteor every METEOR_FREQUENCY_SECONDS
-        # if existing number of meteors is within MAX_METEORS.
-        # The type of meteor added is based on the current meteor_type.
-        if t > self.previous_meteor_time + METEOR_FREQUENCY_SECONDS:
-            self.previous_meteor_time = t
-            if len(self.meteor_list) < MAX_METEORS:
-                for _ in range(METEORS_TO_ADD):
-                    meteor_class = self.meteor_types[self.meteor_type]
-                    self.meteor_list.append(meteor_class())
-
-        # Produce a new ship every SHIP_FREQUENCY_SECONDS
-        if t > self.previous_ship_time + SHIP_FREQUENCY_SECONDS:
-            self.previous_ship_time = t
-            self.ship_list.append(Ship())
+        simulation = self.simulation
+        metrics = self.metrics
+        if self.replaying():
+            with metrics.timer("update"):
+                self.replayer.step(simulation)
+            metrics.sprites(simulation.sprite_counts)
+            if self.replaying():
+                return
+            print(f"Replay finished ({len(self.replayer)} frames, "
+                  f"diverged at frame {self.replayer.diverged})")
+            return
+
+        population = simulation.population
+        with population.timed(), metrics.timer("update"):
+            simulation.update()
+        metrics.sprites(simulation.sprite_counts)
+
+        with population.timed(), metrics.timer("spawn"):
+            simulation.time += FIXED_DT if self.recorder else delta_time
+            simulation.spawn()
+        metrics.sprites(simulation.sprite_counts)
+
+        if self.recorder:
+            self.recorder.frame(simulation)
+
+    def replaying(self):
+        return self.replayer and not self.replayer.done()
+
+    def command(self, name, *args):
+        """ Pass an input on to the simulation (as a method call), and
+            record it. Ignored while a recording is being replayed. """
+        if self.replaying():
+            return
+        if self.recorder:
+            self.recorder.event(name, *args)
+        getattr(self.simulation, name)(*args)
 
     def on_key_press(self, key, modifiers):
+        with self.metrics.timer("input"):
+            self.handle_key(key)
+        self.metrics.sprites(self.simulation.sprite_counts)
+
+    def handle_key(self, key):
         if key == arcade.key.ESCAPE:
             # Quit.
+            self.metrics.close()
+            self.simulation.close()
+            if self.recorder:
+                self.recorder.close()
             arcade.exit()
 
         elif key == arcade.key.F1:
             # Show number of active sprites.
             arcade.print_timings()
-            print(f"Meteors: {len(self.meteor_list)} "
-                  f"Ships: {len(self.ship_list)} "
-                  f"Pilots: {len(self.pilot_list)}")
+            print(f"Meteors: {len(self.simulation.meteor_list)} "
+                  f"Ships: {len(self.simulation.ship_list)} "
+                  f"Pilots: {len(self.simulation.pilot_list)}")
+            simulation = self.simulation
+            print(simulation.population.stats(
+                meteors=simulation.max_meteors,
+                meteors_to_add=simulation.meteors_to_add))
+            for pool in simulation.meteor_pools:
+                print(pool.stats())
+            print(self.metrics.summary())
 
         elif key == arcade.key.SPACE:
             # Eject a pilot from a random ship.
-            ship = choice(self.ship_list)
-            self.eject_pilot_from_ship(ship)
+            self.command("eject_random_pilot")
 
         elif key == arcade.key.BACKSPACE:
             # Eject all the pilots!
-            for ship in self.ship_list:
-                self.eject_pilot_from_ship(ship)
+            self.command("eject_all_pilots")
 
         elif key == arcade.key.T:
             # Toggle Trippy Mode
@@ -315,25 +688,14 @@ class MyGame(arcade.Window):
 
         elif key == arcade.key.F2:
             # Toggle Meteor type
-            self.meteor_type += 1
-            if self.meteor_type >= len(self.meteor_types):
-                self.meteor_type = 0
-            print(self.meteor_types[self.meteor_type])
+            self.command("next_meteor_type")
+            print(self.simulation.meteor_types[self.simulation.meteor_type])
 
     def on_mouse_press(self, x, y, button, key_modifiers):
         """ Eject the pilot from the ships being clicked on. """
-        ships = arcade.get_sprites_at_point((x, y), self.ship_list)
-        for ship in ships:
-            self.eject_pilot_from_ship(ship)
-
-    def eject_pilot_from_ship(self, ship: Ship):
-        """ Create a pilot at the ships location, and set ship tumbling.
-            (Ignore ships that are already tumbling) """
-        if not ship.tumbling:
-            ship.tumble()
-            new_pilot = EjectedPilot(ship.center_x, ship.center_y,
-                                     ship.scale, ship.delta_x/2)
-            self.pilot_list.append(new_pilot)
+        with self.metrics.timer("input"):
+            self.command("eject_pilots_at_point", x, y)
+        self.metrics.sprites(self.simulation.sprite_counts)
 
 
 def main():
@@ -12,8 +12,19 @@ Sprite2 SpriteList Performance:
         - two spritelists.
         - each with their own simple logic.
         - merge both spritelists in to a new spritelist before sorting.
+    Or (MERGED_DRAW):
+        - two spritelists, each kept in scale order.
+        - draw them in merged order without copying (see depth_sort.py).
 
 TLDR: One spritelist (with extra logic) is faster. Copying spritelists is bad!
+      Drawing separate sorted spritelists in merged order (no copy) is as
+      fast as one spritelist.
+      Reproduce the numbers with: python benchmark.py
+      BATCHED_REMOVAL removes the sprites killed in an update all at once
+      at the end of it (see removal.py), instead of one at a time.
+      ECS moves, spins, scales and culls meteors, ships and pilots as
+      archetypes (see ecs.py), so the single spritelist no longer needs
+      any per-type logic. The sprites are only drawn.
 
 Usage:
     Left mouse button - Click on ship to eject the pilot.
@@ -24,9 +35,13 @@ Usage:
     ESC - Quit
 """
 
-from time import time
-from random import uniform, randint, choice
+from math import hypot, inf
+from random import uniform, randint, choice, seed
 import arcade
+import numpy as np
+from depth_sort import DepthSortedSpriteList, MergedDepthView
+from ecs import World
+from removal import BatchedRemovalSpriteList, deferred_removal
 
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
@@ -39,6 +54,9 @@ MAX_SHIPS = 100
 METEOR_FREQUENCY_SECONDS = 0.3
 
 SINGLE_SPRITELIST = False
+MERGED_DRAW = False  # Separate spritelists are merged without copying.
+BATCHED_REMOVAL = True  # Remove killed sprites once per update.
+ECS = False  # Update archetypes of entities, not each sprite (see ecs.py).
 
 # Size of performance graphs and distance between them
 PERFORMANCE_METRICS = True
@@ -162,22 +180,243 @@ class EjectedPilot(arcade.Sprite):
             self.kill()
 
 
+###############################################################################
+class DepthSortedList(DepthSortedSpriteList, BatchedRemovalSpriteList):
+    """ Kept in scale order. Kills can be removed in one batch. """
+
+
+###############################################################################
+class Simulation:
+    """ All the game state and logic, with no window attached.
+        Advance it a fixed amount with step(dt). Time only moves on
+        when step() is called, so a seeded run is always the same. """
+
+    def __init__(self, single_spritelist=SINGLE_SPRITELIST,
+                 merged_draw=MERGED_DRAW,
+                 batched_removal=BATCHED_REMOVAL, ecs=ECS,
+                 max_ships=MAX_SHIPS, ships_to_add=SHIPS_TO_ADD,
+                 random_seed=None):
+        if random_seed is not None:
+            seed(random_seed)
+        Ship.ship_count = 0
+        self.max_ships = max_ships
+        self.ships_to_add = ships_to_add
+
+        self.time = 0.0
+        self.single_spritelist = single_spritelist
+        self.merged_draw = merged_draw
+        self.batched_removal = batched_removal
+        self.meteor_list = BatchedRemovalSpriteList()
+        self.build_lists()
+        # With ecs the sprites are only drawn. The world updates them.
+        self.world = None
+        if ecs:
+            self.world = World(SCREEN_WIDTH)
+            self.meteors = self.world.archetype(
+                "meteors", "position", "velocity", "rotation", "bounds")
+            self.ships = self.world.archetype(
+                "ships", "position", "velocity", "rotation",
+                "scale_animation", "bounds", "tumbling")
+            self.pilots = self.world.archetype(
+                "pilots", "position", "velocity", "rotation",
+                "scale_animation")
+        self.previous_meteor_time = self.time
+        self.previous_ship_time = self.time
+
+    def build_lists(self, sprites=()):
+        """ Make the ship and pilot lists for the current layout, and put
+            the given ships and pilots into them. """
+        if self.single_spritelist:
+            # The single spritelist is sorted when drawn, so it stays a
+            # plain list: pilots appended to it while ejecting go on the
+            # end, and can't land before a ship still to be visited.
+            self.ship_list = BatchedRemovalSpriteList()
+        else:
+            self.ship_list = DepthSortedList()
+        self.pilot_list = DepthSortedList()
+        self.ships_and_pilots = MergedDepthView(self.ship_list,
+                                                self.pilot_list)
+        # Lists whose kills are saved up and removed at the end of update.
+        self.removal_lists = ((self.meteor_list, self.ship_list,
+                               self.pilot_list)
+                              if self.batched_removal else ())
+        for sprite in sprites:
+            if self.single_spritelist or isinstance(sprite, Ship):
+                self.ship_list.append(sprite)
+            else:
+                self.pilot_list.append(sprite)
+
+    def set_single_spritelist(self, single_spritelist):
+        """ Switch between one spritelist and separate ones, moving the
+            ships and pilots into new lists of the right kind. """
+        sprites = [*self.ship_list, *self.pilot_list]
+        for sprite in sprites:
+            sprite.remove_from_sprite_lists()
+        self.single_spritelist = single_spritelist
+        self.build_lists(sprites)
+
+    def step(self, dt):
+        """ Advance the simulation by dt seconds. """
+        self.update()
+        self.time += dt
+        self.spawn()
+
+    def update(self):
+        """ Update sprite positions. """
+        with deferred_removal(*self.removal_lists):
+            if self.world is not None:
+                self.world.update()
+                return
+            self.meteor_list.update()
+            self.ship_list.update()
+            self.pilot_list.update()
+
+    def ship_count(self):
+        """ How many ships are alive. """
+        if self.world is not None:
+            return len(self.ships)
+        return Ship.ship_count
+
+    def spawn(self):
+        """ Create new meteors and ships at regular intervals. """
+        t = self.time
+        # Produce a new meteor every METEOR_FREQUENCY_SECONDS
+        if t > self.previous_meteor_time + METEOR_FREQUENCY_SECONDS:
+            self.previous_meteor_time = t
+            self.add_meteor(Meteor())
+
+        # Produce a new ship every SHIP_FREQUENCY_SECONDS
+        if t > self.previous_ship_time + SHIP_FREQUENCY_SECONDS:
+            self.previous_ship_time = t
+            if self.ship_count() < self.max_ships:
+                for _ in range(self.ships_to_add):
+                    self.add_ship(Ship())
+
+    def add_meteor(self, meteor):
+        """ Add a meteor to draw (and to the world, with ecs). """
+        self.meteor_list.append(meteor)
+        if self.world is not None:
+            # It spins, so cull it once even its corners are off screen.
+            half_width = (hypot(meteor.width, meteor.height) / 2
+                          if meteor.delta_angle else meteor.width / 2)
+            self.meteors.add(meteor, x=meteor.center_x, y=meteor.center_y,
+                             delta_x=meteor.delta_x, angle=meteor.angle,
+                             delta_angle=meteor.delta_angle,
+                             half_width=half_width)
+
+    def add_ship(self, ship):
+        """ Add a ship to draw (and to the world, with ecs). """
+        self.ship_list.append(ship)
+        if self.world is not None:
+            # Facing right, so its width on screen is its hit box's.
+            self.ships.add(ship, x=ship.center_x, y=ship.center_y,
+                           delta_x=ship.delta_x, angle=ship.angle,
+                           delta_angle=ship.delta_angle, scale=ship.scale,
+                           delta_scale=ship.delta_scale, max_scale=inf,
+                           half_width=(ship.right - ship.left) / 2
+                           / ship.scale,
+                           tumbling=ship.tumbling)
+
+    def add_pilot(self, ship):
+        """ Eject a pilot from the ship, into the list the ship is in
+            (the single spritelist), or the pilot list. """
+        pilot = EjectedPilot(ship.center_x, ship.center_y, ship.scale,
+                             ship.delta_x/2)
+        if self.single_spritelist:
+            self.ship_list.append(pilot)
+        else:
+            self.pilot_list.append(pilot)
+        if self.world is not None:
+            self.pilots.add(pilot, x=pilot.center_x, y=pilot.center_y,
+                            delta_x=pilot.delta_x, angle=pilot.angle,
+                            delta_angle=pilot.delta_angle,
+                            scale=pilot.scale,
+                            delta_scale=pilot.delta_scale,
+                            max_scale=pilot.max_scale)
+
+    def depth_sort(self):
+        """ Sort ships and pilots by scale, so bigger/nearer ones are
+            drawn over far away ones. With separate spritelists they are
+            merged into one new list first, or with merged_draw each is
+            kept sorted and drawn in merged order. Returns what to draw. """
+        if self.single_spritelist:
+            self.ship_list.sort(key=lambda s: s.scale)
+            return self.ship_list
+
+        if self.merged_draw:
+            self.ship_list.sort_by_depth()
+            self.pilot_list.sort_by_depth()
+            return self.ships_and_pilots.merge()
+
+        all_sprites = arcade.SpriteList()
+        all_sprites.extend(self.ship_list)
+        all_sprites.extend(self.pilot_list)
+        all_sprites.sort(key=lambda s: s.scale)
+        return all_sprites
+
+    def eject_random_pilot(self):
+        """ Eject a pilot from a random ship. """
+        if self.ship_list:
+            self.eject_pilot_from_ship(choice(self.ship_list))
+
+    def eject_all_pilots(self):
+        """ Eject all the pilots! """
+        if self.world is not None:
+            # Only the ships archetype, no need to check each sprite.
+            ships = self.ships.sprites
+            for row in np.flatnonzero(~self.ships["tumbling"]).tolist():
+                self.add_pilot(ships[row])
+            return
+        for ship in self.ship_list:
+            self.eject_pilot_from_ship(ship)
+
+    def eject_pilots_at_point(self, x, y):
+        """ Eject the pilot from the ships at x, y. """
+        ships = arcade.get_sprites_at_point((x, y), self.ship_list)
+        for ship in ships:
+            self.eject_pilot_from_ship(ship)
+
+    def eject_pilot_from_ship(self, ship: Ship):
+        """ Create a pilot at the ships location, and set ship tumbling.
+            (Ignore ships that are already tumbling) """
+        if self.world is not None:
+            # Only entities in the ships archetype have a pilot.
+            row = self.ships.row(ship)
+            if row is not None and not self.ships["tumbling"][row]:
+                self.add_pilot(ship)
+            return
+
+        if self.single_spritelist:
+            # confirm that ship is really a ship and not a pilot.
+            if type(ship) != Ship:
+                return
+            if not ship.tumbling:
+                # ship.tumble()  # Disabled for testing
+                new_pilot = EjectedPilot(ship.center_x, ship.center_y,
+                                         ship.scale, ship.delta_x/2)
+                self.ship_list.append(new_pilot)
+
+        else:
+            if not ship.tumbling:
+                # ship.tumble()  # Disabled for testing
+                new_pilot = EjectedPilot(ship.center_x, ship.center_y,
+                                         ship.scale, ship.delta_x/2)
+                self.pilot_list.append(new_pilot)
+
+
 ###############################################################################
 class MyGame(arcade.Window):
+    """ Draw the simulation and pass keyboard and mouse input to it. """
+
     def __init__(self, width, height, title, vsync=False):
         super().__init__(width, height, title, vsync)
         arcade.set_background_color(arcade.color.BLACK)
 
-        self.meteor_list = None
-        self.ship_list = None
-        self.pilot_list = None
+        self.simulation = None
+        self.perf_graph_list = None
 
     def setup(self):
-        self.meteor_list = arcade.SpriteList()
-        self.ship_list = arcade.SpriteList()
-        self.pilot_list = arcade.SpriteList()
-        self.previous_meteor_time = time()
-        self.previous_ship_time = time()
+        self.simulation = Simulation()
 
         # Create a sprite list and put the FPS performance graph into it
         self.perf_graph_list = arcade.SpriteList()
@@ -185,81 +424,48 @@ class MyGame(arcade.Window):
         graph.center_x = SCREEN_WIDTH / 2
         graph.top = SCREEN_HEIGHT - 10
         self.perf_graph_list.append(graph)
-        print("SINGLE_SPRITELIST", SINGLE_SPRITELIST)
+        print("SINGLE_SPRITELIST", self.simulation.single_spritelist)
 
     def on_draw(self):
         """ Draw meteor field first.
-            Then merge ships and pilots into one list, then sort by scale.
-            This forces bigger/nearer ones to be drawn over far away ones.
-            There's probably a better way to do this! """
+            Then ships and pilots, sorted by scale to give depth. """
 
         if not TRIPPY_MODE:
             self.clear()
-        self.meteor_list.draw()
-
-        if SINGLE_SPRITELIST:
-            self.ship_list.sort(key=lambda s: s.scale)
-            self.ship_list.draw()
-        else:
-            all_sprites = arcade.SpriteList()
-            all_sprites.extend(self.ship_list)
-            all_sprites.extend(self.pilot_list)
-            all_sprites.sort(key=lambda s: s.scale)
-            all_sprites.draw()
+        self.simulation.meteor_list.draw()
+        self.simulation.depth_sort().draw()
 
         # Draw the performance graph(s)
         if PERFORMANCE_METRICS:
             self.perf_graph_list.draw()
 
     def on_update(self, delta_time):
-        """ Update sprite positions.
-            Create new meteors and ships at regular intervals.
-            Check for keyboard and mouse input. """
-
-        self.meteor_list.update()
-        self.ship_list.update()
-        self.pilot_list.update()
-
-        t = time()
-        # Produce a new meteor every METEOR_FREQUENCY_SECONDS
-        if t > self.previous_meteor_time + METEOR_FREQUENCY_SECONDS:
-            self.previous_meteor_time = t
-            self.meteor_list.append(Meteor())
-
-        # Produce a new ship every SHIP_FREQUENCY_SECONDS
-        if t > self.previous_ship_time + SHIP_FREQUENCY_SECONDS:
-            self.previous_ship_time = t
-            if Ship.ship_count < MAX_SHIPS:
-                for _ in range(SHIPS_TO_ADD):
-                    self.ship_list.append(Ship())
+        self.simulation.step(delta_time)
 
     def on_key_press(self, key, modifiers):
-        global SINGLE_SPRITELIST
-
         if key == arcade.key.ESCAPE:
             # Quit.
             arcade.exit()
 
         elif key == arcade.key.F1:
             # Show number of active sprites.
-            if SINGLE_SPRITELIST:
-                print(f"Meteors: {len(self.meteor_list)} "
-                      f"Ships: {Ship.ship_count} "
-                      f"Total: {len(self.ship_list)}")
+            sim = self.simulation
+            if sim.single_spritelist:
+                print(f"Meteors: {len(sim.meteor_list)} "
+                      f"Ships: {sim.ship_count()} "
+                      f"Total: {len(sim.ship_list)}")
             else:
-                print(f"Meteors: {len(self.meteor_list)} "
-                      f"Ships: {len(self.ship_list)} "
-                      f"Pilots: {len(self.pilot_list)}")
+                print(f"Meteors: {len(sim.meteor_list)} "
+                      f"Ships: {len(sim.ship_list)} "
+                      f"Pilots: {len(sim.pilot_list)}")
 
         elif key == arcade.key.SPACE:
             # Eject a pilot from a random ship.
-            ship = choice(self.ship_list)
-            self.eject_pilot_from_ship(ship)
+            self.simulation.eject_random_pilot()
 
         elif key == arcade.key.BACKSPACE:
             # Eject all the pilots!
-            for ship in self.ship_list:
-                self.eject_pilot_from_ship(ship)
+            self.simulation.eject_all_pilots()
 
         elif key == arcade.key.T:
             # Toggle Trippy Mode
@@ -272,35 +478,14 @@ class MyGame(arcade.Window):
             PERFORMANCE_METRICS = not PERFORMANCE_METRICS
 
         elif key == arcade.key.F2:
-            # Toggle Performance Metrics
-            SINGLE_SPRITELIST = not SINGLE_SPRITELIST
-            print("SINGLE_SPRITELIST", SINGLE_SPRITELIST)
+            # Toggle Single/Separate spritelists
+            sim = self.simulation
+            sim.set_single_spritelist(not sim.single_spritelist)
+            print("SINGLE_SPRITELIST", sim.single_spritelist)
 
     def on_mouse_press(self, x, y, button, key_modifiers):
         """ Eject the pilot from the ships being clicked on. """
-        ships = arcade.get_sprites_at_point((x, y), self.ship_list)
-        for ship in ships:
-            self.eject_pilot_from_ship(ship)
-
-    def eject_pilot_from_ship(self, ship: Ship):
-        """ Create a pilot at the ships location, and set ship tumbling.
-            (Ignore ships that are already tumbling) """
-        if SINGLE_SPRITELIST:
-            # confirm that ship is really a ship and not a pilot.
-            if type(ship) != Ship:
-                return
-            if not ship.tumbling:
-                # ship.tumble()  # Disabled for testing
-                new_pilot = EjectedPilot(ship.center_x, ship.center_y,
-                                         ship.scale, ship.delta_x/2)
-                self.ship_list.append(new_pilot)
-
-        else:
-            if not ship.tumbling:
-                # ship.tumble()  # Disabled for testing
-                new_pilot = EjectedPilot(ship.center_x, ship.center_y,
-                                         ship.scale, ship.delta_x/2)
-                self.pilot_list.append(new_pilot)
+        self.simulation.eject_pilots_at_point(x, y)
 
 
 def main():
@@ -0,0 +1,88 @@
+"""
+Tracer: Write frames out as a timeline for chrome://tracing or Perfetto.
+    Aggregate numbers (see metrics.py) say how long phases take on
+    average, a timeline shows how they line up in individual frames.
+    Tracer collects Trace Event Format events:
+        - slice(name): a with block, shown as a bar on the timeline.
+        - counter(name, **values): a graph with one line per value.
+        - instant(name, **args): a marker at one moment, e.g. a key press.
+    and save() writes them as JSON that loads straight into
+    chrome://tracing or https://ui.perfetto.dev
+    Without a filename it is turned off, and costs (almost) nothing.
+"""
+
+from contextlib import nullcontext
+import json
+import os
+from time import perf_counter
+
+NULL_SLICE = nullcontext()
+
+
+###############################################################################
+class TraceSlice:
+    """ A with block that adds a complete ("X") event when it ends. """
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = self.tracer.now()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.add("X", self.name, ts=self.start,
+                        dur=self.tracer.now() - self.start)
+
+
+###############################################################################
+class Tracer:
+    """ Trace events for one process (and thread), saved to filename. """
+
+    def __init__(self, filename=None, process_name="pyarc"):
+        self.filename = filename
+        self.enabled = filename is not None
+        self.pid = os.getpid()
+        self.start = perf_counter()
+        self.events = []
+        self.slices = {}  # name -> TraceSlice, reused.
+        if self.enabled:
+            self.events.append({"ph": "M", "name": "process_name",
+                                "pid": self.pid, "tid": 0,
+                                "args": {"name": process_name}})
+
+    def now(self):
+        """ Microseconds since the tracer was made. """
+        return (perf_counter() - self.start) * 1_000_000
+
+    def add(self, phase, name, ts=None, **fields):
+        event = {"ph": phase, "name": name, "pid": self.pid, "tid": 0,
+                 "ts": self.now() if ts is None else ts}
+        event.update(fields)
+        self.events.append(event)
+
+    def slice(self, name):
+        if not self.enabled:
+            return NULL_SLICE
+        try:
+            return self.slices[name]
+        except KeyError:
+            trace_slice = self.slices[name] = TraceSlice(self, name)
+            return trace_slice
+
+    def counter(self, name, **values):
+        if self.enabled:
+            self.add("C", name, args=values)
+
+    def instant(self, name, **args):
+        if self.enabled:
+            self.add("i", name, s="p", args=args)
+
+    def save(self):
+        if not self.enabled:
+            return
+        with open(self.filename, "w") as f:
+            json.dump({"traceEvents": self.events,
+                       "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,101 @@
+"""
+ZoomerSwarm: Move a whole swarm of sprite1 Zoomers in one go with NumPy.
+    Like MeteorField, position, heading, speed and rotation live in
+    arrays, so a frame is one vectorized step and one boolean mask to
+    cull the zoomers whose bounding circle has left the screen.
+    Headings are unit vectors, and only the zoomers that turn have
+    theirs (and their angle) worked out again.
+"""
+
+import numpy as np
+
+
+###############################################################################
+class ZoomerSwarm:
+    """ Vectorized replacement for calling Zoomer.update() on every zoomer.
+        Zoomers fly off in any direction, so they are culled once their
+        bounding circle is entirely off screen. """
+
+    def __init__(self, sprite_list, width, height):
+        self.sprite_list = sprite_list  # Where the zoomers get drawn from.
+        self.width = width
+        self.height = height
+        self.sprites = []
+        self.new_sprites = []  # Added since the last update.
+
+        self.position = np.zeros((0, 2))
+        self.heading = np.zeros((0, 2))  # Unit vectors.
+        self.speed = np.zeros(0)
+        self.angle = np.zeros(0)
+        self.change_angle = np.zeros(0)
+        self.radius = np.zeros(0)  # Centre to furthest corner.
+
+    def __len__(self):
+        return len(self.sprites) + len(self.new_sprites)
+
+    def append(self, zoomer):
+        """ Add a zoomer to the swarm (and to the sprite list for drawing).
+            Its arrays are built in bulk at the start of the next update. """
+        self.new_sprites.append(zoomer)
+        self.sprite_list.append(zoomer)
+
+    def add_new_sprites(self):
+        """ Move newly added zoomers into the arrays. """
+        new = self.new_sprites
+        self.new_sprites = []
+
+        self.sprites.extend(new)
+        position = [(z.center_x, z.center_y) for z in new]
+        angle = np.array([z.angle for z in new], float)
+        radians = np.radians(angle)
+        heading = np.column_stack((-np.sin(radians), np.cos(radians)))
+        self.position = np.concatenate([self.position, position])
+        self.heading = np.concatenate([self.heading, heading])
+        self.speed = np.append(self.speed, [z.speed for z in new])
+        self.angle = np.append(self.angle, angle)
+        self.change_angle = np.append(self.change_angle,
+                                      [z.change_angle for z in new])
+        self.radius = np.append(self.radius, [z.radius for z in new])
+
+    def update(self):
+        """ Move and turn every zoomer, then kill the ones off screen. """
+        if self.new_sprites:
+            self.add_new_sprites()
+        if not self.sprites:
+            return
+
+        # Move in the direction each was facing, then turn.
+        self.position += self.heading * self.speed[:, None]
+        turning = np.flatnonzero(self.change_angle)
+        self.angle[turning] += self.change_angle[turning]
+        radians = np.radians(self.angle[turning])
+        self.heading[turning, 0] = -np.sin(radians)
+        self.heading[turning, 1] = np.cos(radians)
+
+        # Kill if the bounding circle is off screen.
+        x, y = self.position.T
+        alive = ((x + self.radius >= 0) & (x - self.radius <= self.width)
+                 & (y + self.radius >= 0) & (y - self.radius <= self.height))
+        if not alive.all():
+            for i in np.flatnonzero(~alive):
+                self.sprites[i].kill()
+            self.sprites = [s for s, keep in zip(self.sprites, alive) if keep]
+            self.position = self.position[alive]
+            self.heading = self.heading[alive]
+            self.speed = self.speed[alive]
+            self.angle = self.angle[alive]
+            self.change_angle = self.change_angle[alive]
+            self.radius = self.radius[alive]
+
+        self.push_to_sprites()
+
+    def push_to_sprites(self):
+        """ Copy the new positions (and angles) back to the sprites.
+            Only zoomers that actually turn have their angle set. """
+        sprites = self.sprites
+        for sprite, position in zip(sprites, self.position.tolist()):
+            sprite.position = tuple(position)
+
+        turning = np.flatnonzero(self.change_angle)
+        for i, angle in zip(turning.tolist(), self.angle[turning].tolist()):
+            sprites[i].angle = angle